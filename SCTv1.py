@@ -2,22 +2,867 @@ import os
 import time
 import random
 import json
-import pandas as pd
+import argparse
+import uuid
+import csv
+import re
 import shutil
-from datetime import datetime, timedelta
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
+import glob
+import heapq
+import itertools
+import functools
+import math
+import threading
+import sqlite3
+import hashlib
+import queue
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 
-def setup_driver(download_path):
-    """Configurar el driver de Chrome con las opciones necesarias"""
+# pandas y selenium.webdriver tardan en importarse: se cargan con load_heavy_imports()
+# recién cuando hacen falta, para que --help, --validar y --dry-run arranquen al instante
+pd = None
+webdriver = None
+By = WebDriverWait = EC = Select = Options = Keys = ActionChains = None
+
+def load_heavy_imports():
+    """Importar pandas y Selenium WebDriver en el espacio de nombres del módulo"""
+    global pd, webdriver, By, WebDriverWait, EC, Select, Options, Keys, ActionChains
+    if webdriver is not None:
+        return
+    import pandas
+    from selenium import webdriver as selenium_webdriver
+    from selenium.webdriver.common.by import By as by
+    from selenium.webdriver.support.ui import WebDriverWait as web_driver_wait, Select as select
+    from selenium.webdriver.support import expected_conditions
+    from selenium.webdriver.chrome.options import Options as options
+    from selenium.webdriver.common.keys import Keys as keys
+    from selenium.webdriver.common.action_chains import ActionChains as action_chains
+    pd = pandas
+    By, WebDriverWait, Select, EC = by, web_driver_wait, select, expected_conditions
+    Options, Keys, ActionChains = options, keys, action_chains
+    webdriver = selenium_webdriver
+
+# psutil es opcional: sin él no se controla la memoria del navegador
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Bloqueo de archivos entre procesos: fcntl en Linux/macOS, msvcrt en Windows
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Rutas por defecto (se pueden sobreescribir por línea de comandos)
+DEFAULT_EXCEL_PATH = r"C:\Users\eze\Downloads\CREDENCIALES.xlsx"
+DEFAULT_DOWNLOAD_PATH = r"C:\Users\eze\Downloads"
+
+LOGIN_URL = "https://auth.afip.gob.ar/contribuyente_/login.xhtml"
+
+# Subcarpeta temporal donde cada descarga se escribe aislada del resto
+DOWNLOAD_JOBS_DIR = ".descargas_sct"
+
+class CdpEventLog:
+    """Lector de eventos CDP a partir del log de performance de chromedriver.
+    
+    El log se vacía en cada lectura, por eso los eventos se reparten a todos
+    los suscriptores registrados en el momento de leerlos, junto con el id del
+    target (pestaña) que los generó.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.listeners = []
+        self.available = True
+    
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+    
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    
+    def poll(self):
+        """Leer los eventos pendientes y notificar a los suscriptores"""
+        if not self.available:
+            return
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            # El driver no expone el log de performance: los consumidores usan su alternativa
+            self.available = False
+            return
+        for entry in entries:
+            try:
+                payload = json.loads(entry["message"])
+                message = payload["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method", "")
+            params = message.get("params", {})
+            webview = payload.get("webview")
+            for listener in list(self.listeners):
+                listener(method, params, webview)
+
+class DownloadWatcher:
+    """Detectar la finalización de una descarga en una carpeta exclusiva para el trabajo.
+    
+    Se basa en los eventos CDP downloadWillBegin/downloadProgress para conocer el
+    GUID y el nombre sugerido del archivo. Si los eventos no están disponibles,
+    revisa la carpeta del trabajo hasta que aparezca un archivo completo.
+    """
+    def __init__(self, driver, download_path, timeout=60, poll_interval=0.1):
+        self.driver = driver
+        self.download_path = download_path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.job_path = os.path.join(download_path, DOWNLOAD_JOBS_DIR, uuid.uuid4().hex)
+        self.guid = None
+        self.suggested_filename = None
+        self.state = None
+    
+    def __enter__(self):
+        os.makedirs(self.job_path, exist_ok=True)
+        # allowAndName guarda el archivo con el GUID de la descarga como nombre
+        self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allowAndName",
+            "downloadPath": os.path.abspath(self.job_path),
+            "eventsEnabled": True,
+        })
+        # Descartar eventos viejos para no confundirlos con los de esta descarga
+        events = self._events()
+        events.poll()
+        events.subscribe(self._on_event)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._events().unsubscribe(self._on_event)
+        try:
+            self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": os.path.abspath(self.download_path),
+            })
+        except Exception:
+            pass
+        shutil.rmtree(self.job_path, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.job_path))
+        except OSError:
+            pass
+        return False
+    
+    def _events(self):
+        events = getattr(self.driver, "cdp_events", None)
+        if events is None:
+            events = self.driver.cdp_events = CdpEventLog(self.driver)
+        return events
+    
+    def _on_event(self, method, params, webview=None):
+        if method in ("Page.downloadWillBegin", "Browser.downloadWillBegin") and self.guid is None:
+            self.guid = params.get("guid")
+            self.suggested_filename = params.get("suggestedFilename")
+        elif method in ("Page.downloadProgress", "Browser.downloadProgress"):
+            if params.get("guid") == self.guid:
+                self.state = params.get("state")
+    
+    def _completed_file_in_dir(self, sizes):
+        """Alternativa sin eventos: un archivo sin .crdownload cuyo tamaño no cambió entre dos lecturas"""
+        for name in os.listdir(self.job_path):
+            if name.endswith(".crdownload") or name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.job_path, name)
+            size = os.path.getsize(path)
+            if size > 0 and sizes.get(name) == size:
+                return path
+            sizes[name] = size
+        return None
+    
+    def wait_for_file(self):
+        """Esperar hasta que la descarga termine y devolver la ruta del archivo.
+        
+        Lanza TimeoutException si no termina dentro del tiempo límite.
+        """
+        deadline = time.monotonic() + self.timeout
+        sizes = {}
+        events = self._events()
+        while time.monotonic() < deadline:
+            events.poll()
+            if self.state == "canceled":
+                raise TimeoutException(f"La descarga {self.guid} fue cancelada")
+            if self.state == "completed":
+                path = os.path.join(self.job_path, self.guid)
+                if os.path.exists(path):
+                    return path
+            if not events.available:
+                path = self._completed_file_in_dir(sizes)
+                if path:
+                    self.guid = self.guid or os.path.basename(path)
+                    return path
+            time.sleep(self.poll_interval)
+        raise TimeoutException(f"La descarga no terminó en {self.timeout} segundos")
+
+# --- Política de esperas -------------------------------------------------
+# Cada paso del flujo declara la condición del DOM/red que necesita y un tiempo
+# mínimo de permanencia "humano" opcional. Los tiempos reales se registran en
+# WAIT_REPORT para poder ajustar los mínimos a partir de datos.
+
+def document_ready(driver):
+    """Condición: el documento terminó de cargar"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+def xhr_idle(driver):
+    """Condición: no hay pedidos XHR/fetch pendientes (contador inyectado en prepare_tab)"""
+    return driver.execute_script(
+        "return document.readyState === 'complete' && "
+        "(window.__sctPendingRequests || 0) === 0 && "
+        "(!window.jQuery || window.jQuery.active === 0)")
+
+def page_ready(driver):
+    """Condición: documento cargado y red en reposo"""
+    return document_ready(driver) and xhr_idle(driver)
+
+def all_of(*conditions):
+    """Combinar condiciones: devuelve el resultado de la última si todas se cumplen"""
+    def _condition(driver):
+        result = None
+        for condition in conditions:
+            result = condition(driver)
+            if not result:
+                return False
+        return result
+    return _condition
+
+def new_window_opened(previous_handles):
+    """Condición: se abrió una ventana/pestaña nueva respecto de las anteriores"""
+    def _condition(driver):
+        return len(driver.window_handles) > previous_handles
+    return _condition
+
+def page_replaced(element):
+    """Condición: el elemento de la página anterior quedó obsoleto y la nueva cargó"""
+    return all_of(EC.staleness_of(element), document_ready)
+
+class WaitPolicy:
+    """Política de espera de un paso: condición, tiempo límite y permanencia mínima.
+    
+    page_load indica que el paso termina con una página nueva cargada, para medirla.
+    """
+    def __init__(self, condition=None, timeout=20, dwell=(0.0, 0.0), page_load=False):
+        self.condition = condition
+        self.timeout = timeout
+        self.dwell = dwell
+        self.page_load = page_load
+
+class WaitReport:
+    """Registro de cuánto tardó realmente cada espera"""
+    def __init__(self):
+        self.samples = {}
+    
+    def record(self, step, waited, total):
+        self.samples.setdefault(step, []).append((waited, total))
+    
+    def merge(self, samples):
+        for step, values in samples.items():
+            self.samples.setdefault(step, []).extend(tuple(v) for v in values)
+    
+    def trim(self, limit):
+        """Conservar solo las últimas limit muestras de cada paso (procesos de larga duración)"""
+        for values in list(self.samples.values()):
+            del values[:-limit]
+    
+    def summary(self):
+        """Devolver por paso: cantidad, promedio, mínimo y máximo de la condición y total con permanencia"""
+        rows = []
+        for step, values in sorted(self.samples.items()):
+            waited = [v[0] for v in values]
+            total = [v[1] for v in values]
+            rows.append({
+                "paso": step,
+                "cantidad": len(values),
+                "condicion_promedio": sum(waited) / len(waited),
+                "condicion_min": min(waited),
+                "condicion_max": max(waited),
+                "total_promedio": sum(total) / len(total),
+            })
+        return rows
+    
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\nTiempos de espera por paso (segundos):")
+        print(f"  {'paso':<28}{'n':>5}{'prom':>8}{'min':>8}{'max':>8}{'total':>8}")
+        for r in rows:
+            print(f"  {r['paso']:<28}{r['cantidad']:>5}{r['condicion_promedio']:>8.2f}"
+                  f"{r['condicion_min']:>8.2f}{r['condicion_max']:>8.2f}{r['total_promedio']:>8.2f}")
+    
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"resumen": self.summary(), "muestras": self.samples}, f, indent=2)
+
+WAIT_REPORT = WaitReport()
+
+# Las condiciones que dependen del contexto (elemento o cantidad de pestañas)
+# se declaran como funciones que reciben ese contexto.
+WAIT_POLICIES = {
+    # Login
+    "login.pagina": WaitPolicy(lambda: EC.element_to_be_clickable((By.ID, "F1:username")), dwell=(0.5, 1.0),
+                               page_load=True),
+    "login.cuit_ingresado": WaitPolicy(lambda: EC.element_to_be_clickable((By.ID, "F1:btnSiguiente")), dwell=(0.3, 0.6)),
+    "login.password_visible": WaitPolicy(lambda: EC.element_to_be_clickable((By.ID, "F1:password")), dwell=(0.3, 0.6)),
+    "login.clave_ingresada": WaitPolicy(lambda: EC.element_to_be_clickable((By.ID, "F1:btnIngresar")), dwell=(0.25, 0.5)),
+    "login.post_ingreso": WaitPolicy(lambda element: page_replaced(element), dwell=(0.5, 1.0), page_load=True),
+    # Navegación al SCT
+    "sct.portal_listo": WaitPolicy(
+        lambda: all_of(page_ready, EC.element_to_be_clickable((By.XPATH, "//*[@id='buscadorInput']"))), dwell=(0.3, 0.8)),
+    "sct.buscador_activo": WaitPolicy(dwell=(0.3, 0.6)),
+    "sct.resultados": WaitPolicy(
+        lambda: EC.element_to_be_clickable((By.XPATH, "//*[@id='rbt-menu-item-0']/a/div/div/div[1]/div/p")), dwell=(0.3, 0.8)),
+    "sct.nueva_pestana": WaitPolicy(lambda handles: new_window_opened(handles), timeout=15),
+    "sct.pestana_cargada": WaitPolicy(lambda: page_ready, dwell=(0.3, 0.8), page_load=True),
+    "sct.reintento": WaitPolicy(lambda: document_ready, dwell=(1.0, 2.0)),
+    "sct.pestana_cerrada": WaitPolicy(lambda: document_ready, dwell=(0.3, 0.8)),
+    "auth.refresco": WaitPolicy(lambda: page_ready, dwell=(1.0, 2.0)),
+    # Popup de noticias
+    "popup.cerrado": WaitPolicy(lambda: EC.invisibility_of_element_located((By.XPATH, "//*[@id='noticias']/div/a")),
+                                timeout=5, dwell=(0.2, 0.5)),
+    # Selección de contribuyente (el select envía el formulario en onchange)
+    "contribuyente.enviado": WaitPolicy(lambda element: all_of(page_replaced(element), xhr_idle), dwell=(0.3, 0.8),
+                                        page_load=True),
+    "contribuyente.reenviado": WaitPolicy(lambda: page_ready, dwell=(0.3, 0.8)),
+    # Consulta por períodos (--periodos)
+    "historico.consulta": WaitPolicy(lambda element: all_of(page_replaced(element), xhr_idle), dwell=(0.3, 0.8),
+                                     page_load=True),
+    # Logout
+    "logout.menu": WaitPolicy(
+        lambda: EC.element_to_be_clickable((By.XPATH, "//*[@id='contBtnContribuyente']/div[6]/button/div/div[2]")),
+        dwell=(0.3, 0.8)),
+    "logout.completado": WaitPolicy(lambda element: page_replaced(element), dwell=(0.5, 1.0), page_load=True),
+}
+
+def wait_step(driver, step, *context):
+    """Esperar la condición declarada para el paso y completar la permanencia mínima.
+    
+    Devuelve el resultado de la condición (por ejemplo, el elemento encontrado).
+    Lanza TimeoutException si la condición no se cumple a tiempo.
+    """
+    policy = WAIT_POLICIES[step]
+    start = time.monotonic()
+    result = None
+    try:
+        if policy.condition is not None:
+            result = WebDriverWait(driver, policy.timeout, poll_frequency=0.1).until(policy.condition(*context))
+        if policy.page_load:
+            PAGE_METRICS.log(driver, step)
+    finally:
+        waited = time.monotonic() - start
+        dwell = random.uniform(*policy.dwell)
+        if waited < dwell:
+            time.sleep(dwell - waited)
+        WAIT_REPORT.record(step, waited, time.monotonic() - start)
+    return result
+
+# --- Trazas de tiempo por paso --------------------------------------------
+
+def percentile(values, q):
+    """Percentil por rango más cercano de una lista de valores"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class Tracer:
+    """Registro de spans de tiempo de cada paso, con el CUIT y el intento en curso.
+    
+    Los spans se agregan a un archivo JSONL a medida que ocurren (si se configuró
+    una ruta) y se conservan en memoria para el resumen final.
+    """
+    def __init__(self):
+        self.spans = []
+        self.path = None
+        # El contexto es propio de cada hilo: en modo servicio cada navegador corre en su hilo
+        self.local = threading.local()
+    
+    @property
+    def context(self):
+        if not hasattr(self.local, "context"):
+            self.local.context = {}
+        return self.local.context
+    
+    @context.setter
+    def context(self, value):
+        self.local.context = value
+    
+    def configure(self, path):
+        self.path = path
+    
+    def trim(self, limit):
+        """Conservar en memoria solo los últimos limit spans; el archivo JSONL queda completo"""
+        del self.spans[:-limit]
+    
+    def record(self, span):
+        self.spans.append(span)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+    
+    def summary(self):
+        """Devolver por paso: cantidad, p50, p95, máximo y tasa de fallos"""
+        by_step = {}
+        for span in self.spans:
+            by_step.setdefault(span["paso"], []).append(span)
+        rows = []
+        for step, spans in sorted(by_step.items()):
+            durations = [span["duracion"] for span in spans]
+            rows.append({
+                "paso": step,
+                "cantidad": len(spans),
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "max": max(durations),
+                "tasa_fallos": sum(1 for span in spans if not span["ok"]) / len(spans),
+            })
+        return rows
+    
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\nLatencia por paso (segundos):")
+        print(f"  {'paso':<32}{'n':>5}{'p50':>8}{'p95':>8}{'max':>8}{'fallos':>8}")
+        for r in rows:
+            print(f"  {r['paso']:<32}{r['cantidad']:>5}{r['p50']:>8.2f}{r['p95']:>8.2f}"
+                  f"{r['max']:>8.2f}{r['tasa_fallos']:>8.0%}")
+    
+    def export_chrome_trace(self, path):
+        """Exportar los spans en formato Trace Event de Chrome (chrome://tracing, Perfetto)"""
+        origin = min((span["inicio"] for span in self.spans), default=0)
+        events = []
+        for span in self.spans:
+            events.append({
+                "name": span["paso"],
+                "cat": "sct",
+                "ph": "X",
+                "ts": int((span["inicio"] - origin) * 1e6),
+                "dur": int(span["duracion"] * 1e6),
+                "pid": span.get("worker") or 0,
+                "tid": span.get("pid", 0),
+                "args": {k: v for k, v in span.items() if k not in ("paso", "inicio", "duracion")},
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+TRACER = Tracer()
+
+def traced(name, check_result=True):
+    """Decorador que registra un span por cada llamada al paso.
+    
+    Con check_result, un resultado False o None cuenta como fallo.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            # Con --metricas-navegador, los pasos que reciben el driver miden también el navegador
+            driver = args[0] if BROWSER_METRICS.path and args and hasattr(args[0], "execute_cdp_cmd") else None
+            before = BROWSER_METRICS.snapshot(driver) if driver is not None else None
+            t0 = time.perf_counter()
+            ok = False
+            error = None
+            try:
+                result = func(*args, **kwargs)
+                ok = not check_result or (result is not False and result is not None)
+                return result
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+                raise
+            finally:
+                span = {"paso": name, "inicio": start, "duracion": time.perf_counter() - t0, "ok": ok, "error": error}
+                span.update(TRACER.context)
+                span["pid"] = os.getpid()
+                TRACER.record(span)
+                if before is not None:
+                    BROWSER_METRICS.record(driver, before, span)
+        return wrapper
+    return decorator
+
+# Perfil liviano (--headless): recursos y hosts que no hacen falta para el flujo
+LEAN_WINDOW_SIZE = "1280,900"
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*facebook.net*", "*clarity.ms*",
+]
+LEAN_BLOCKED_HOSTS = [
+    "www.google-analytics.com", "www.googletagmanager.com", "stats.g.doubleclick.net",
+    "static.hotjar.com", "connect.facebook.net", "www.clarity.ms",
+]
+
+# Ocultar navigator.webdriver para eliminar el banner de automatización
+HIDE_WEBDRIVER_SCRIPT = """
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined
+})
+"""
+
+# Contar pedidos XHR/fetch pendientes para la condición xhr_idle
+PENDING_REQUESTS_SCRIPT = """
+(function() {
+    if (window.__sctPendingRequests !== undefined) { return; }
+    window.__sctPendingRequests = 0;
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__sctPendingRequests++;
+        this.addEventListener('loadend', () => window.__sctPendingRequests--);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function() {
+            window.__sctPendingRequests++;
+            return originalFetch.apply(this, arguments).finally(() => window.__sctPendingRequests--);
+        };
+    }
+})();
+"""
+
+def prepare_tab(driver):
+    """Aplicar la configuración CDP que es propia de cada pestaña.
+    
+    Page.addScriptToEvaluateOnNewDocument y Network.setBlockedURLs solo afectan
+    a la pestaña activa, por eso se aplican cada vez que se cambia a una pestaña
+    nueva (una sola vez por pestaña). El contador de XHR también se instala en el
+    documento actual, por si la pestaña ya estaba cargando al cambiar a ella.
+    """
+    prepared = driver.__dict__.setdefault("prepared_tabs", set())
+    try:
+        handle = driver.current_window_handle
+    except Exception:
+        handle = None
+    if handle in prepared:
+        return
+    prepared.add(handle)
+    try:
+        for script in (HIDE_WEBDRIVER_SCRIPT, PENDING_REQUESTS_SCRIPT):
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+        driver.execute_script(PENDING_REQUESTS_SCRIPT)
+    except Exception as e:
+        print(f"No se pudieron instalar los scripts de la pestaña: {str(e)}")
+    if not getattr(driver, "lean", False):
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    except Exception as e:
+        print(f"No se pudo aplicar el bloqueo de recursos: {str(e)}")
+
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+const end = nav && nav.loadEventEnd ? nav.loadEventEnd : performance.now();
+return {url: location.href, load_ms: nav ? end - nav.startTime : null, bytes: bytes, requests: resources.length + 1};
+"""
+
+class PageMetrics:
+    """Registro de bytes transferidos y tiempo de carga de cada página.
+    
+    Usa Navigation/Resource Timing del navegador; cada medición se agrega a las
+    trazas como un span "pagina.<paso>".
+    """
+    def __init__(self):
+        self.enabled = False
+    
+    def log(self, driver, label):
+        if not self.enabled:
+            return
+        try:
+            data = driver.execute_script(PAGE_METRICS_SCRIPT)
+        except Exception:
+            return
+        load_ms = data.get("load_ms") or 0
+        print(f"Página {label}: {data['bytes'] / 1024:.0f} KB en {data['requests']} pedidos, carga {load_ms / 1000:.2f} s")
+        span = {"paso": f"pagina.{label}", "inicio": time.time() - load_ms / 1000, "duracion": load_ms / 1000,
+                "ok": True, "error": None, "url": data["url"], "bytes": data["bytes"], "pedidos": data["requests"]}
+        span.update(TRACER.context)
+        span["pid"] = os.getpid()
+        TRACER.record(span)
+
+PAGE_METRICS = PageMetrics()
+
+# Navigation Timing del documento actual, en milisegundos desde el inicio de la navegación
+NAVIGATION_TIMING_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+if (!nav) { return null; }
+return {ttfb_ms: nav.responseStart - nav.requestStart, dom_ms: nav.domContentLoadedEventEnd,
+        load_ms: nav.loadEventEnd || null};
+"""
+
+class NetworkCounter:
+    """Acumula bytes y pedidos terminados a partir de los eventos CDP de red"""
+    def __init__(self, events):
+        self.bytes = 0
+        self.requests = 0
+        events.subscribe(self.on_event)
+    
+    def on_event(self, method, params, webview=None):
+        if method == "Network.loadingFinished":
+            self.bytes += params.get("encodedDataLength", 0)
+            self.requests += 1
+        elif method == "Network.loadingFailed":
+            self.requests += 1
+
+class BrowserMetrics:
+    """Métricas del navegador por paso: red, heap de JS, nodos del DOM y tiempos de
+    layout/script (CDP Performance.getMetrics), más Navigation Timing.
+    
+    Cada paso trazado que recibe el driver agrega una línea al archivo JSONL de la
+    corrida, con el CUIT en curso. Los tiempos acumulados se restan solo si el
+    paso terminó en la misma pestaña en la que empezó.
+    """
+    METRICS = {"JSHeapUsedSize": "js_heap_mb", "Nodes": "nodos_dom", "LayoutDuration": "layout_s",
+               "RecalcStyleDuration": "estilos_s", "ScriptDuration": "script_s", "TaskDuration": "tareas_s"}
+    CUMULATIVE = ("layout_s", "estilos_s", "script_s", "tareas_s")
+    
+    def __init__(self):
+        self.path = None
+    
+    def configure(self, path):
+        self.path = path
+    
+    def attach(self, driver):
+        """Empezar a contar el tráfico de red de un navegador nuevo"""
+        if self.path:
+            driver.network_counter = NetworkCounter(driver.cdp_events)
+    
+    def snapshot(self, driver):
+        try:
+            handle = driver.current_window_handle
+            # Performance.enable es propio de cada pestaña
+            if not hasattr(driver, "performance_tabs"):
+                driver.performance_tabs = set()
+            if handle not in driver.performance_tabs:
+                driver.execute_cdp_cmd("Performance.enable", {"timeDomain": "timeTicks"})
+                driver.performance_tabs.add(handle)
+            raw = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            driver.cdp_events.poll()
+        except Exception:
+            return None
+        values = {self.METRICS[m["name"]]: m["value"] for m in raw if m["name"] in self.METRICS}
+        values["js_heap_mb"] = values.get("js_heap_mb", 0) / (1024 * 1024)
+        counter = getattr(driver, "network_counter", None)
+        values["bytes"] = counter.bytes if counter else 0
+        values["pedidos"] = counter.requests if counter else 0
+        values["pestana"] = handle
+        return values
+    
+    def record(self, driver, before, span):
+        after = self.snapshot(driver)
+        if after is None:
+            return
+        try:
+            timing = driver.execute_script(NAVIGATION_TIMING_SCRIPT) or {}
+        except Exception:
+            timing = {}
+        same_tab = after["pestana"] == before["pestana"]
+        entry = {"paso": span["paso"], "inicio": span["inicio"], "duracion": round(span["duracion"], 3),
+                 "ok": span["ok"], "bytes": after["bytes"] - before["bytes"],
+                 "pedidos": after["pedidos"] - before["pedidos"],
+                 "js_heap_mb": round(after.get("js_heap_mb", 0), 2), "nodos_dom": after.get("nodos_dom")}
+        for key in self.CUMULATIVE:
+            value = after.get(key, 0) - (before.get(key, 0) if same_tab else 0)
+            entry[key] = round(value, 4)
+        entry.update({k: round(v, 1) for k, v in timing.items() if v is not None})
+        for key in ("worker", "cuit_ingreso", "cuit_contribuyente", "intento"):
+            entry[key] = span.get(key)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+BROWSER_METRICS = BrowserMetrics()
+
+def load_browser_metrics(path):
+    """Agrupar por paso las líneas de un archivo de métricas del navegador"""
+    by_step = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            by_step.setdefault(entry["paso"], []).append(entry)
+    return by_step
+
+def compare_browser_metrics(base_path, new_path):
+    """Comparar la mediana de cada métrica por paso entre dos corridas"""
+    base = load_browser_metrics(base_path)
+    new = load_browser_metrics(new_path)
+    columns = ["duracion", "bytes", "pedidos", "js_heap_mb", "nodos_dom", "script_s", "layout_s"]
+    print(f"\nComparación de métricas del navegador (mediana por paso): {base_path} -> {new_path}")
+    for step in sorted(set(base) | set(new)):
+        print(f"\n  {step} (n={len(base.get(step, []))} -> {len(new.get(step, []))})")
+        for column in columns:
+            values = []
+            for entries in (base.get(step, []), new.get(step, [])):
+                data = [e[column] for e in entries if e.get(column) is not None]
+                values.append(percentile(data, 50) if data else None)
+            old, current = values
+            if old is None or current is None:
+                print(f"    {column:<12}{str(old):>14}{str(current):>14}")
+                continue
+            change = f"{(current - old) / old:+.0%}" if old else "-"
+            print(f"    {column:<12}{old:>14.2f}{current:>14.2f}{change:>8}")
+
+class ProfileTemplate:
+    """Plantilla de perfil de Chrome precalentada que se clona para cada navegador.
+    
+    La plantilla se prepara una vez abriendo la página de login (queda la caché
+    HTTP con los JS/CSS del portal) y borrando las cookies. Cada navegador,
+    incluidos los de otros workers, usa una copia propia que se elimina al
+    cerrarlo. La plantilla se vuelve a preparar si supera max_mb o max_hours.
+    """
+    MARKER = "plantilla.json"
+    # Cada clon guarda el PID del proceso que lo usa
+    OWNER = "propietario.pid"
+    # Archivos de bloqueo y de volcados que no deben copiarse a los clones
+    IGNORE = staticmethod(shutil.ignore_patterns("Singleton*", "lockfile", "Crashpad", "*.tmp"))
+    
+    def __init__(self, root, max_mb=300, max_hours=24):
+        self.root = root
+        self.template = os.path.join(root, "plantilla")
+        self.clones = os.path.join(root, "clones")
+        self.max_mb = max_mb
+        self.max_hours = max_hours
+    
+    @staticmethod
+    def size_mb(path):
+        total = 0
+        for folder, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(folder, name))
+                except OSError:
+                    continue
+        return total / (1024 * 1024)
+    
+    def is_ready(self):
+        """Verificar que la plantilla existe y no superó la edad ni el tamaño máximos"""
+        marker = os.path.join(self.root, self.MARKER)
+        if not os.path.exists(marker) or not os.path.isdir(self.template):
+            return False
+        age_hours = (time.time() - os.path.getmtime(marker)) / 3600
+        if self.max_hours and age_hours > self.max_hours:
+            print(f"La plantilla de perfil tiene {age_hours:.0f} h: se vuelve a preparar")
+            return False
+        size = self.size_mb(self.template)
+        if self.max_mb and size > self.max_mb:
+            print(f"La plantilla de perfil ocupa {size:.0f} MB: se vuelve a preparar")
+            return False
+        return True
+    
+    @staticmethod
+    def pid_alive(pid):
+        """Verificar si el proceso sigue vivo; ante la duda se lo considera vivo"""
+        if psutil is not None:
+            return psutil.pid_exists(pid)
+        if os.name != "posix":
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+    
+    def prune(self):
+        """Eliminar clones que quedaron de corridas interrumpidas.
+        
+        Solo se borran los clones cuyo proceso propietario terminó; los que no
+        tienen archivo de propietario (copia en curso) se borran pasada una hora.
+        """
+        if not os.path.isdir(self.clones):
+            return
+        for name in os.listdir(self.clones):
+            path = os.path.join(self.clones, name)
+            try:
+                with open(os.path.join(path, self.OWNER), encoding="utf-8") as f:
+                    orphan = not self.pid_alive(int(f.read().strip()))
+            except (OSError, ValueError):
+                try:
+                    orphan = time.time() - os.path.getmtime(path) > 3600
+                except OSError:
+                    continue
+            if orphan:
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def prime(self, download_path, login_url, headless=False):
+        """Preparar la plantilla si hace falta. Devuelve False si no se pudo"""
+        self.prune()
+        if self.is_ready():
+            return True
+        print("Preparando la plantilla de perfil de Chrome...")
+        shutil.rmtree(self.template, ignore_errors=True)
+        os.makedirs(self.template, exist_ok=True)
+        driver = None
+        try:
+            driver = setup_driver(download_path, headless=headless, user_data_dir=self.template)
+            driver.get(login_url)
+            wait_step(driver, "login.pagina")
+            # Las cookies no deben pasar a los clones: cada navegador inicia su propia sesión
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception as e:
+            print(f"No se pudo preparar la plantilla de perfil: {str(e)}")
+            return False
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        with open(os.path.join(self.root, self.MARKER), "w", encoding="utf-8") as f:
+            json.dump({"creado": datetime.now().isoformat(timespec="seconds"), "login_url": login_url,
+                       "mb": round(self.size_mb(self.template), 1)}, f)
+        print(f"Plantilla de perfil lista ({self.size_mb(self.template):.0f} MB)")
+        return True
+    
+    def clone(self):
+        """Copiar la plantilla a una carpeta propia del navegador; None si no hay plantilla"""
+        if not os.path.exists(os.path.join(self.root, self.MARKER)):
+            return None
+        path = os.path.join(self.clones, uuid.uuid4().hex)
+        try:
+            shutil.copytree(self.template, path, ignore=self.IGNORE)
+            with open(os.path.join(path, self.OWNER), "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+        except (OSError, shutil.Error) as e:
+            print(f"No se pudo clonar la plantilla de perfil: {str(e)}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return path
+
+@traced("setup_driver")
+def setup_driver(download_path, headless=False, user_data_dir=None):
+    """Configurar el driver de Chrome con las opciones necesarias.
+    
+    Con headless=True usa el perfil liviano: Chrome new-headless con ventana fija
+    chica, sin imágenes y con fuentes, multimedia y analítica bloqueadas. Con
+    user_data_dir usa esa carpeta de perfil (por ejemplo un clon de la plantilla).
+    """
+    load_heavy_imports()
     chrome_options = Options()
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(user_data_dir)}")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_argument("--no-default-browser-check")
     
     # Configurar la carpeta de descargas (versión optimizada)
     prefs = {
@@ -30,8 +875,22 @@ def setup_driver(download_path):
         # Asegurarse de que los archivos Excel y PDF se descarguen correctamente
         "browser.helperApps.neverAsk.saveToDisk": "application/vnd.ms-excel;application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;application/csv;text/csv;application/pdf"
     }
+    if headless:
+        # Bloquear imágenes en todo el navegador (incluidas las pestañas nuevas)
+        prefs["profile.managed_default_content_settings.images"] = 2
     chrome_options.add_experimental_option("prefs", prefs)
     
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--disable-background-networking")
+        # Los hosts de analítica se resuelven a una dirección inválida en todas las pestañas
+        rules = ", ".join(f"MAP {host} 0.0.0.0" for host in LEAN_BLOCKED_HOSTS)
+        chrome_options.add_argument(f"--host-resolver-rules={rules}")
+    
     # Eliminar el mensaje "Un software automatizado está controlando Chrome"
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
@@ -39,39 +898,147 @@ def setup_driver(download_path):
     # Agregar argumento para eliminar el banner de automatización
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
     
+    # Habilitar el log de performance para recibir eventos CDP (descargas, red)
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    
     # Inicializar el driver
     driver = webdriver.Chrome(options=chrome_options)
+    driver.cdp_events = CdpEventLog(driver)
+    driver.auth_errors = AuthErrorDetector(driver.cdp_events)
+    BROWSER_METRICS.attach(driver)
+    driver.lean = headless
     
-    # Ejecutar JavaScript para eliminar el banner de automatización
-    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-        "source": """
-        Object.defineProperty(navigator, 'webdriver', {
-            get: () => undefined
+    if headless:
+        # En headless las descargas requieren habilitarse explícitamente
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": os.path.abspath(download_path),
+            "eventsEnabled": True,
         })
-        """
-    })
+    
+    # Scripts de cada documento (banner de automatización, contador de XHR) y bloqueo de recursos
+    prepare_tab(driver)
     
     return driver
 
+CREDENTIAL_COLUMNS = ['CUIT Ingreso', 'CLAVE Ingreso', 'CUIT Contribuyente']
+CUIT_WEIGHTS = [5, 4, 3, 2, 7, 6, 5, 4, 3, 2]
+
+def normalize_cuit(value):
+    """Normalizar un CUIT leído de la planilla a 11 dígitos sin separadores.
+    
+    Corrige los valores que Excel guarda como número (20123456789.0).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    text = re.sub(r"\.0+$", "", text)
+    return re.sub(r"\D", "", text)
+
+def digito_verificador(base):
+    """Dígito verificador (módulo 11) de los primeros 10 dígitos de un CUIT"""
+    resto = 11 - sum(int(d) * w for d, w in zip(base[:10], CUIT_WEIGHTS)) % 11
+    return 0 if resto == 11 else 9 if resto == 10 else resto
+
+def cuit_valido(cuit):
+    """Verificar longitud y dígito verificador (módulo 11) de un CUIT"""
+    if len(cuit) != 11 or not cuit.isdigit():
+        return False
+    return digito_verificador(cuit) == int(cuit[10])
+
+def iter_credential_rows(path):
+    """Recorrer las filas de la planilla de credenciales sin cargarla completa.
+    
+    Acepta .xlsx (openpyxl en modo solo lectura) o .csv. Devuelve tuplas
+    (número de fila, {columna: valor}).
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            reader = csv.reader(f, dialect)
+            header = [str(h or "").strip() for h in next(reader, [])]
+            for number, row in enumerate(reader, start=2):
+                yield number, dict(zip(header, row))
+        return
+    
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h or "").strip() for h in next(rows, [])]
+        for number, row in enumerate(rows, start=2):
+            yield number, dict(zip(header, row))
+    finally:
+        workbook.close()
+
+def load_credentials(path):
+    """Leer, normalizar y validar las credenciales.
+    
+    Devuelve (credenciales, problemas, duplicadas): las filas válidas como
+    [cuit_ingreso, clave, cuit_contribuyente], la lista de (fila, motivo) de las
+    filas descartadas y la cantidad de filas repetidas que se omitieron.
+    """
+    credentials = []
+    problems = []
+    seen = set()
+    duplicates = 0
+    header_checked = False
+    for number, row in iter_credential_rows(path):
+        if not header_checked:
+            # Verificar que existan las columnas necesarias
+            missing = [col for col in CREDENTIAL_COLUMNS if col not in row]
+            if missing:
+                raise ValueError(f"El archivo debe contener la columna '{missing[0]}'")
+            header_checked = True
+        
+        values = [row.get(col) for col in CREDENTIAL_COLUMNS]
+        if all(v is None or str(v).strip() == "" for v in values):
+            continue
+        
+        cuit_ingreso = normalize_cuit(row.get('CUIT Ingreso'))
+        clave = "" if row.get('CLAVE Ingreso') is None else str(row.get('CLAVE Ingreso'))
+        cuit_contribuyente = normalize_cuit(row.get('CUIT Contribuyente'))
+        
+        if not cuit_valido(cuit_ingreso):
+            problems.append((number, f"CUIT Ingreso inválido: {row.get('CUIT Ingreso')}"))
+            continue
+        if not cuit_valido(cuit_contribuyente):
+            problems.append((number, f"CUIT Contribuyente inválido: {row.get('CUIT Contribuyente')}"))
+            continue
+        if not clave.strip():
+            problems.append((number, "CLAVE Ingreso vacía"))
+            continue
+        
+        key = (cuit_ingreso, cuit_contribuyente)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        credentials.append([cuit_ingreso, clave, cuit_contribuyente])
+    return credentials, problems, duplicates
+
 def read_credentials(excel_path):
-    """Leer credenciales desde el archivo Excel"""
+    """Leer credenciales desde el archivo Excel (o CSV) e informar las filas descartadas"""
     try:
-        df = pd.read_excel(excel_path)
-        # Verificar que existan las columnas necesarias
-        required_columns = ['CUIT Ingreso', 'CLAVE Ingreso', 'CUIT Contribuyente']
-        for col in required_columns:
-            if col not in df.columns:
-                print(f"Error: El archivo Excel debe contener la columna '{col}'")
-                return []
-        
-        # Convertir CUIT a string para asegurar formato correcto
-        df['CUIT Ingreso'] = df['CUIT Ingreso'].astype(str)
-        df['CUIT Contribuyente'] = df['CUIT Contribuyente'].astype(str)
-        
-        return df[required_columns].values.tolist()
+        credentials, problems, duplicates = load_credentials(excel_path)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return []
     except Exception as e:
         print(f"Error al leer el archivo Excel: {str(e)}")
         return []
+    
+    if problems:
+        print(f"Se descartaron {len(problems)} filas con datos inválidos:")
+        for number, motivo in problems:
+            print(f"  - Fila {number}: {motivo}")
+    if duplicates:
+        print(f"Se omitieron {duplicates} filas repetidas (mismo CUIT Ingreso y CUIT Contribuyente).")
+    return credentials
 
 def human_typing(element, text):
     """Simular escritura humana tecla por tecla con pausas aleatorias"""
@@ -82,52 +1049,329 @@ def human_typing(element, text):
         if random.random() < 0.2:  # 20% de probabilidad
             time.sleep(random.uniform(0.1, 0.3))
 
+def fast_typing(driver, element, text):
+    """Escribir el texto completo de una sola vez.
+    
+    Usa CDP Input.insertText sobre el elemento enfocado (dispara los eventos de
+    input como una escritura real); si no está disponible, un único send_keys.
+    """
+    try:
+        driver.execute_script("arguments[0].focus();", element)
+        driver.execute_cdp_cmd("Input.insertText", {"text": text})
+    except Exception:
+        element.send_keys(text)
+
+class InputEngine:
+    """Motor de escritura con perfiles seleccionables por corrida.
+    
+    human: tecla por tecla con pausas (comportamiento original).
+    fast: texto completo en una sola llamada.
+    adaptive: empieza como fast y pasa a human el resto de la corrida si el sitio
+    muestra errores de autenticación o señales de detección de bots.
+    """
+    PROFILES = ("human", "fast", "adaptive")
+    
+    def __init__(self, profile="human"):
+        self.configure(profile)
+    
+    def configure(self, profile):
+        if profile not in self.PROFILES:
+            raise ValueError(f"Perfil de escritura desconocido: {profile}")
+        self.profile = profile
+        self.degraded = False
+    
+    def mode(self):
+        if self.profile == "human" or (self.profile == "adaptive" and self.degraded):
+            return "human"
+        return "fast"
+    
+    def describe(self):
+        """Perfil activo para registrar en los resultados"""
+        if self.profile == "adaptive":
+            return f"adaptive:{self.mode()}"
+        return self.profile
+    
+    def type(self, driver, element, text):
+        if self.mode() == "human":
+            human_typing(element, text)
+        else:
+            fast_typing(driver, element, text)
+    
+    def report_suspicion(self, reason):
+        """Registrar una señal del sitio; en modo adaptive pasa a escritura humana"""
+        if self.profile == "adaptive" and not self.degraded:
+            print(f"Se detectó '{reason}'. Cambiando a escritura humana por el resto de la corrida.")
+            self.degraded = True
+
+INPUT_ENGINE = InputEngine()
+
+class FileLock:
+    """Bloqueo exclusivo sobre un archivo, compartido entre procesos"""
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+    
+    def __enter__(self):
+        self.file = open(self.path, "a+b")
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            # LK_LOCK reintenta durante 10 segundos antes de fallar
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if fcntl:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+
+class RateGovernor:
+    """Limitador de ritmo con token buckets compartidos por todos los navegadores.
+    
+    Hay un bucket por tipo de pedido (login, navegacion, exportacion) con su ritmo
+    en pedidos por minuto. El estado vive en un archivo JSON protegido con un
+    bloqueo de archivo, así lo comparten los procesos worker. Cuando los
+    detectores de error de autenticación se disparan, el factor de ritmo se
+    reduce a la mitad; después de un rato sin errores vuelve a subir de a poco.
+    """
+    MIN_FACTOR = 0.1
+    RECOVERY_STEP = 0.1
+    # Segundos sin errores antes de empezar a subir el ritmo, y entre subidas
+    COOLDOWN = 60.0
+    
+    def __init__(self):
+        self.path = None
+        self.rates = {}
+    
+    def configure(self, path, rates):
+        """rates: {bucket: pedidos por minuto}; un ritmo 0 deja el bucket sin límite"""
+        self.path = path
+        self.rates = {name: rate for name, rate in rates.items() if rate}
+    
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"factor": 1.0, "ultimo_error": 0.0, "ultimo_ajuste": 0.0, "buckets": {}}
+    
+    def _save(self, state):
+        # Único por proceso e hilo: en modo servicio varios hilos guardan a la vez
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+    
+    def _recover(self, state, now):
+        """Subir el factor según el tiempo transcurrido desde el último error.
+        
+        Se aplican todas las subidas vencidas de una vez: el estado sobrevive entre
+        corridas y una corrida posterior no debe arrancar con el ritmo reducido.
+        """
+        if state["factor"] >= 1.0:
+            return
+        interval = self.COOLDOWN / 2
+        due = max(state["ultimo_ajuste"] + interval, state["ultimo_error"] + self.COOLDOWN)
+        if now < due:
+            return
+        steps = 1 + int((now - due) // interval)
+        state["factor"] = round(min(1.0, state["factor"] + steps * self.RECOVERY_STEP), 3)
+        state["ultimo_ajuste"] = due + (steps - 1) * interval
+        print(f"Sin errores de autenticación: ritmo al {state['factor']:.0%}")
+    
+    def acquire(self, bucket):
+        """Esperar hasta tener un token del bucket. Devuelve los segundos esperados"""
+        rate = self.rates.get(bucket)
+        if not self.path or not rate:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            with FileLock(self.path + ".lock"):
+                state = self._load()
+                now = time.time()
+                self._recover(state, now)
+                per_second = rate * state["factor"] / 60
+                entry = state["buckets"].setdefault(bucket, {"tokens": 1.0, "actualizado": now})
+                # Ráfaga máxima de un pedido: el ritmo se mantiene parejo entre workers
+                entry["tokens"] = min(1.0, entry["tokens"] + (now - entry["actualizado"]) * per_second)
+                entry["actualizado"] = now
+                if entry["tokens"] >= 1.0:
+                    entry["tokens"] -= 1.0
+                    self._save(state)
+                    break
+                self._save(state)
+                delay = (1.0 - entry["tokens"]) / per_second
+            time.sleep(min(delay, 1.0))
+        waited = time.monotonic() - start
+        if waited >= 1.0:
+            print(f"Ritmo de {bucket}: se esperaron {waited:.1f} s")
+        return waited
+    
+    def report_auth_error(self):
+        """Reducir el ritmo de todos los buckets ante un error de autenticación"""
+        if not self.path or not self.rates:
+            return
+        with FileLock(self.path + ".lock"):
+            state = self._load()
+            now = time.time()
+            state["factor"] = max(self.MIN_FACTOR, state["factor"] / 2)
+            state["ultimo_error"] = now
+            state["ultimo_ajuste"] = now
+            self._save(state)
+        print(f"Error de autenticación: ritmo reducido al {state['factor']:.0%}")
+
+RATE_GOVERNOR = RateGovernor()
+
+@traced("login_afip")
 def login_afip(driver, cuit, clave, wait):
     """Realizar el login en AFIP simulando comportamiento humano"""
+    RATE_GOVERNOR.acquire("login")
     try:
         # Ingresar CUIT
         cuit_input = wait.until(EC.element_to_be_clickable((By.ID, "F1:username")))
         cuit_input.clear()
-        # Escribir CUIT tecla por tecla
-        human_typing(cuit_input, cuit)
+        # Escribir CUIT según el perfil de escritura activo
+        INPUT_ENGINE.type(driver, cuit_input, cuit)
         
-        # Pequeña pausa antes de hacer clic en el botón
-        time.sleep(random.uniform(0.3, 0.6))
-        
-        # Click en botón siguiente
-        next_button = wait.until(EC.element_to_be_clickable((By.ID, "F1:btnSiguiente")))
+        # Click en botón siguiente (con una pequeña pausa previa)
+        next_button = wait_step(driver, "login.cuit_ingresado")
         next_button.click()
         
         # Esperar a que aparezca el campo de contraseña
-        time.sleep(random.uniform(1.0, 1.5))
-        
-        # Ingresar Clave
-        clave_input = wait.until(EC.element_to_be_clickable((By.ID, "F1:password")))
+        clave_input = wait_step(driver, "login.password_visible")
         clave_input.clear()
-        # Escribir clave tecla por tecla
-        human_typing(clave_input, clave)
+        # Escribir clave según el perfil de escritura activo
+        INPUT_ENGINE.type(driver, clave_input, clave)
         
-        # Pequeña pausa antes de hacer clic en el botón de login
-        time.sleep(random.uniform(0.25, 0.5))
-        
-        # Click en botón de login
-        login_button = wait.until(EC.element_to_be_clickable((By.ID, "F1:btnIngresar")))
+        # Click en botón de login (con una pequeña pausa previa)
+        login_button = wait_step(driver, "login.clave_ingresada")
         login_button.click()
         
         # Esperar a que cargue la página después del login
-        time.sleep(random.uniform(2.0, 4.0))
+        wait_step(driver, "login.post_ingreso", login_button)
+        
+        # Si el formulario volvió con un mensaje de error, AFIP rechazó las credenciales
+        if login_rejected(driver):
+            print(f"AFIP rechazó las credenciales del CUIT {cuit}")
+            return False
         return True
     except Exception as e:
         print(f"Error en el login: {str(e)}")
         return False
 
+def login_rejected(driver):
+    """Verificar si el formulario de login muestra un mensaje de error (usuario o clave incorrectos)"""
+    try:
+        messages = driver.find_elements(By.ID, "F1:msg")
+        return any(m.is_displayed() and m.text.strip() for m in messages)
+    except Exception:
+        return False
+
+class AuthErrorDetector:
+    """Detectar errores de autenticación a partir de las respuestas de red de la pestaña.
+    
+    Escucha Network.responseReceived a través de CdpEventLog y guarda las respuestas
+    de documentos recibidas desde el último arm(). Así un 401 o una página de error
+    se reconocen por código de estado y URL, sin leer el texto de la página. Cada
+    respuesta guarda el target que la generó para juzgar solo la pestaña del SCT.
+    """
+    def __init__(self, events):
+        self.events = events
+        self.responses = deque(maxlen=20)
+        events.subscribe(self.on_event)
+    
+    def on_event(self, method, params, webview=None):
+        if method != "Network.responseReceived" or params.get("type") != "Document":
+            return
+        # Solo el documento principal: el frame principal tiene el mismo id que su
+        # target, así un iframe de terceros con error no se toma como de la pestaña
+        frame = params.get("frameId")
+        if webview and frame and frame.upper() != webview.upper():
+            return
+        response = params.get("response", {})
+        self.responses.append((response.get("status"), response.get("url", ""), webview))
+    
+    def arm(self):
+        """Descartar las respuestas anteriores antes de abrir o refrescar una página"""
+        self.events.poll()
+        self.responses.clear()
+    
+    def verdict(self, target=None):
+        """Devolver '401', 'error', 'ok' o None si no hay eventos de red para decidir.
+        
+        Con target se consideran solo las respuestas de esa pestaña; el filtro se
+        aplica al juzgar porque la pestaña del SCT puede abrirse después de arm().
+        """
+        self.events.poll()
+        if not self.events.available:
+            return None
+        responses = [(status, url) for status, url, webview in self.responses
+                     if not target or not webview or webview.upper() == target.upper()]
+        if not responses:
+            return None
+        for status, url in responses:
+            if status == 401:
+                return "401"
+        for status, url in responses:
+            path = url.split("?", 1)[0].lower()
+            if (status or 0) >= 400 or any(marker in path for marker in AUTH_ERROR_URL_MARKERS):
+                return "error"
+        return "ok"
+
+# Fragmentos de la ruta de las páginas de error de autenticación
+AUTH_ERROR_URL_MARKERS = ("/error", "autherror")
+
+# Predicados puntuales: devuelven un booleano en lugar de transferir el texto de la página
+AUTH_401_SCRIPT = """
+const text = document.body ? document.body.textContent : '';
+return text.includes('HTTP Status 401') && text.includes('AUTHENTICATION_ALREADY_PRESENT');
+"""
+AUTH_MESSAGE_SCRIPT = """
+const text = document.body ? document.body.textContent : '';
+return text.includes('Ha ocurrido un error al autenticar') || text.includes('intente nuevamente');
+"""
+
+def arm_auth_detector(driver):
+    """Preparar el detector de red antes de abrir una pestaña o refrescarla"""
+    detector = getattr(driver, "auth_errors", None)
+    if detector:
+        detector.arm()
+
+def auth_verdict(driver):
+    """Veredicto de red para la pestaña actual (su handle es el id del target CDP)"""
+    detector = getattr(driver, "auth_errors", None)
+    if not detector:
+        return None
+    try:
+        target = driver.current_window_handle
+    except Exception:
+        target = None
+    return detector.verdict(target)
+
 def check_authentication_error(driver):
-    """Verificar si hay un error de autenticación en la página"""
+    """Verificar si hay un error de autenticación HTTP 401 en la pestaña actual"""
     try:
-        # Verificar si hay un mensaje de error de autenticación
-        error_text = driver.find_element(By.TAG_NAME, "body").text
-        if "HTTP Status 401" in error_text and "AUTHENTICATION_ALREADY_PRESENT" in error_text:
+        verdict = auth_verdict(driver)
+        if verdict is None:
+            # Sin eventos de red: la página del SCT descarta el error sin revisar el texto
+            found = not sct_page_loaded(driver) and driver.execute_script(AUTH_401_SCRIPT)
+        else:
+            found = verdict == "401"
+        if found:
             print("Detectado error de autenticación: HTTP Status 401 - AUTHENTICATION_ALREADY_PRESENT")
+            INPUT_ENGINE.report_suspicion("HTTP 401")
+            RATE_GOVERNOR.report_auth_error()
             return True
         return False
     except:
@@ -136,11 +1380,17 @@ def check_authentication_error(driver):
 def check_authentication_error_message(driver):
     """Verificar si hay un mensaje de error de autenticación en español y refrescar la página usando el botón del navegador"""
     try:
-        # Verificar si hay un mensaje de error de autenticación en español
-        error_text = driver.find_element(By.TAG_NAME, "body").text
-        if "Ha ocurrido un error al autenticar" in error_text or "intente nuevamente" in error_text:
+        # El mensaje llega con estado 200: la red solo lo confirma por la URL de error
+        if auth_verdict(driver) == "error":
+            found = True
+        else:
+            found = not sct_page_loaded(driver) and driver.execute_script(AUTH_MESSAGE_SCRIPT)
+        if found:
             print("Detectado error de autenticación en español: 'Ha ocurrido un error al autenticar, intente nuevamente.'")
+            INPUT_ENGINE.report_suspicion("error al autenticar")
+            RATE_GOVERNOR.report_auth_error()
             print("Haciendo clic en el botón de refrescar del navegador...")
+            arm_auth_detector(driver)
             
             try:
                 # Intentar encontrar y hacer clic en el botón de refrescar del navegador
@@ -161,43 +1411,41 @@ def check_authentication_error_message(driver):
                         print("No se pudo encontrar el botón de refrescar. Usando driver.refresh() como alternativa")
                         driver.refresh()
                 
-                time.sleep(random.uniform(3.0, 5.0))
+                wait_step(driver, "auth.refresco")
                 return True
             except Exception as e:
                 print(f"Error al intentar refrescar la página: {str(e)}. Usando driver.refresh() como alternativa")
                 driver.refresh()
-                time.sleep(random.uniform(3.0, 5.0))
+                wait_step(driver, "auth.refresco")
                 return True
         return False
     except:
         return False
 
+@traced("navigate_to_sct")
 def navigate_to_sct(driver, wait, cuit, max_attempts=3):
     """Navegar al Sistema de Cuentas Tributarias usando el buscador con reintentos"""
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"Navegando al Sistema de Cuentas Tributarias para CUIT: {cuit} (Intento {attempt}/{max_attempts})")
+            RATE_GOVERNOR.acquire("navegacion")
             
-            # Esperar a que la página principal cargue completamente
-            time.sleep(random.uniform(1.0, 2.0))
-            
-            # Buscar el campo de búsqueda
+            # Esperar a que la página principal cargue completamente y buscar el campo de búsqueda
             print("Buscando el campo de búsqueda...")
-            search_input = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='buscadorInput']")))
+            search_input = wait_step(driver, "sct.portal_listo")
             
             # Mover el mouse al elemento antes de hacer clic
             actions = ActionChains(driver)
             actions.move_to_element(search_input).pause(random.uniform(0.25, 0.75)).perform()
             search_input.click()
-            time.sleep(random.uniform(0.5, 1.0))
+            wait_step(driver, "sct.buscador_activo")
             
             # Limpiar el campo de búsqueda
             search_input.clear()
             
-            # Escribir "SISTEMA DE CUENTAS TRIBUTARIAS" tecla por tecla
+            # Escribir "SISTEMA DE CUENTAS TRIBUTARIAS" según el perfil de escritura activo
             print("Escribiendo 'SISTEMA DE CUENTAS TRIBUTARIAS' en el buscador...")
-            human_typing(search_input, "SISTEMA DE CUENTAS TRIBUTARIAS")
-            time.sleep(random.uniform(1.5, 2.0))
+            INPUT_ENGINE.type(driver, search_input, "SISTEMA DE CUENTAS TRIBUTARIAS")
             
             # Esperar a que aparezcan los resultados de búsqueda
             print("Esperando resultados de búsqueda...")
@@ -205,49 +1453,59 @@ def navigate_to_sct(driver, wait, cuit, max_attempts=3):
             # Buscar y hacer clic en el resultado del Sistema de Cuentas Tributarias
             try:
                 # Intentar encontrar el resultado específico (primer resultado)
-                result_item = wait.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//*[@id='rbt-menu-item-0']/a/div/div/div[1]/div/p")))
+                result_item = wait_step(driver, "sct.resultados")
                 
                 # Verificar que el texto del resultado contenga "Sistema de Cuentas Tributarias"
                 if "Sistema de Cuentas Tributarias" in result_item.text:
                     print(f"Resultado encontrado: {result_item.text}")
                     
+                    # La ruta se aprende de la pestaña del SCT ya cargada: el href de los
+                    # resultados del buscador es "#" y resolvería a la página del portal
+                    portal_url = driver.current_url
+                    
                     # Mover el mouse al elemento antes de hacer clic
                     actions = ActionChains(driver)
+                    handles_before = len(driver.window_handles)
+                    arm_auth_detector(driver)
                     actions.move_to_element(result_item).pause(random.uniform(0.5, 1.0)).perform()
                     result_item.click()
-                    time.sleep(random.uniform(2.0, 3.0))
                     
                     # Cambiar a la nueva pestaña que se abre
                     print("Cambiando a la nueva pestaña...")
+                    try:
+                        wait_step(driver, "sct.nueva_pestana", handles_before)
+                    except TimeoutException:
+                        pass
                     if len(driver.window_handles) > 1:
                         driver.switch_to.window(driver.window_handles[-1])
-                        time.sleep(random.uniform(2.0, 3.0))
+                        prepare_tab(driver)
+                        wait_step(driver, "sct.pestana_cargada")
                         
                         # Verificar si hay error de autenticación (HTTP Status 401)
                         if check_authentication_error(driver):
                             print("Cerrando pestaña con error HTTP 401 y reintentando...")
                             driver.close()
                             driver.switch_to.window(driver.window_handles[0])
-                            time.sleep(random.uniform(2.0, 3.0))
+                            wait_step(driver, "sct.reintento")
                             continue  # Reintentar
                         
                         # Verificar si hay error de autenticación en español
                         if check_authentication_error_message(driver):
                             print("Se refrescó la página debido al error de autenticación")
-                            time.sleep(random.uniform(2.0, 3.0))
                             # No cerramos la pestaña, solo esperamos a que se refresque
                             # Verificamos si después del refresh sigue el error
                             if check_authentication_error_message(driver):
                                 print("El error persiste después de refrescar. Cerrando pestaña y reintentando...")
                                 driver.close()
                                 driver.switch_to.window(driver.window_handles[0])
-                                time.sleep(random.uniform(2.0, 3.0))
+                                wait_step(driver, "sct.reintento")
                                 continue  # Reintentar
                         
                         # Intentar cerrar la ventana emergente si existe
                         try_close_popup(driver, wait)
                         
+                        if sct_page_loaded(driver):
+                            SCT_ROUTE_CACHE.learn(cuit, driver.current_url, portal_url)
                         return True
                     else:
                         print("No se abrió una nueva pestaña para el Sistema de Cuentas Tributarias")
@@ -266,11 +1524,145 @@ def navigate_to_sct(driver, wait, cuit, max_attempts=3):
             if len(driver.window_handles) > 1:
                 driver.close()
                 driver.switch_to.window(driver.window_handles[0])
-                time.sleep(random.uniform(1.5, 2.0))
+                wait_step(driver, "sct.reintento")
     
     print(f"No se pudo navegar al Sistema de Cuentas Tributarias después de {max_attempts} intentos")
     return False
 
+class SctRouteCache:
+    """Caché en disco de la URL de entrada al SCT aprendida con el buscador del portal.
+    
+    El CUIT de login se guarda como {cuit} para reutilizar la ruta con otras cuentas.
+    Una ruta que falló no se vuelve a aprender durante el resto de la corrida.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.url = None
+        self.failed = set()
+        self.load()
+    
+    def configure(self, path):
+        self.path = path
+        self.url = None
+        self.failed = set()
+        self.load()
+    
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.url = json.load(f).get("url")
+            except (OSError, ValueError):
+                self.url = None
+    
+    def entry_url(self, cuit):
+        return self.url.replace("{cuit}", cuit) if self.url else None
+    
+    @staticmethod
+    def usable(url, portal_url=None):
+        """Una ruta de entrada válida es http(s), sin fragmento y fuera del host del portal"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.fragment or url.endswith("#"):
+            return False
+        return not (portal_url and parsed.netloc == urlparse(portal_url).netloc)
+    
+    def learn(self, cuit, url, portal_url=None):
+        """Guardar la ruta (de forma atómica para convivir con otros workers)"""
+        if not self.path or not url or not self.usable(url, portal_url):
+            return
+        template = url.replace(cuit, "{cuit}")
+        if template == self.url or template in self.failed:
+            return
+        self.url = template
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": template, "aprendido": datetime.now().isoformat(timespec="seconds")}, f)
+        os.replace(tmp_path, self.path)
+        print(f"Ruta de entrada al SCT guardada en caché: {template}")
+    
+    def invalidate(self):
+        if self.url:
+            self.failed.add(self.url)
+        self.url = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+SCT_ROUTE_CACHE = SctRouteCache()
+
+# Selectores de la página del SCT
+SCT_CUIT_FORM_ID = "cuitForm"
+SCT_TABLE_WRAPPER_ID = "DataTables_Table_0_wrapper"
+SCT_CUIT_SELECT_XPATH = "//div[@id='cuitForm']/select[@name='$PropertySelection']"
+# IDs del formulario de filtro por período (--periodos)
+SCT_FILTER_IDS = {"desde": "periodoDesde", "hasta": "periodoHasta", "impuesto": "impuesto",
+                  "consultar": "btnConsultar"}
+
+def sct_page_loaded(driver):
+    """Verificar que la pestaña actual muestra el SCT (selector de contribuyente o tabla)"""
+    return bool(driver.find_elements(By.ID, SCT_CUIT_FORM_ID) or driver.find_elements(By.ID, SCT_TABLE_WRAPPER_ID))
+
+def filtro_periodos_disponible(driver):
+    """Verificar, sin esperar, que la página tiene el formulario de filtro por período"""
+    try:
+        return all(driver.find_elements(By.ID, SCT_FILTER_IDS[field]) for field in ("desde", "hasta", "consultar"))
+    except Exception:
+        return False
+
+def export_failure_reason(driver, options):
+    """Motivo de una exportación fallida: sin filtro de períodos el reintento no sirve"""
+    if options.periodos and not filtro_periodos_disponible(driver):
+        return "filtro_periodos_no_disponible"
+    return "exportacion"
+
+@traced("navigate_to_sct_directo")
+def navigate_to_sct_direct(driver, wait, cuit):
+    """Abrir el SCT con la ruta en caché en una pestaña nueva, sin pasar por el buscador.
+    
+    Devuelve False (dejando la pestaña del portal activa) si no hay ruta en caché,
+    si responde con error de autenticación o si la página no es la esperada.
+    """
+    url = SCT_ROUTE_CACHE.entry_url(cuit)
+    if not url:
+        return False
+    
+    print(f"Abriendo el Sistema de Cuentas Tributarias con la ruta en caché para CUIT: {cuit}")
+    RATE_GOVERNOR.acquire("navegacion")
+    portal_handle = driver.current_window_handle
+    try:
+        # Se usa una pestaña nueva para que close_sct_tab y logout_afip sigan funcionando igual
+        driver.switch_to.new_window("tab")
+        prepare_tab(driver)
+        arm_auth_detector(driver)
+        driver.get(url)
+        wait_step(driver, "sct.pestana_cargada")
+        
+        if check_authentication_error(driver) or check_authentication_error_message(driver):
+            print("La ruta en caché respondió con error de autenticación. Usando el buscador...")
+        elif not sct_page_loaded(driver):
+            print(f"La ruta en caché llevó a una página inesperada ({driver.current_url}). Se descarta la caché.")
+            SCT_ROUTE_CACHE.invalidate()
+        else:
+            try_close_popup(driver, wait)
+            return True
+    except Exception as e:
+        print(f"Error al abrir el SCT con la ruta en caché: {str(e)}")
+    
+    # Volver a la pestaña del portal para usar el buscador
+    try:
+        if driver.current_window_handle != portal_handle:
+            driver.close()
+        driver.switch_to.window(portal_handle)
+    except Exception:
+        driver.switch_to.window(driver.window_handles[0])
+    return False
+
+def open_sct(driver, wait, cuit, options):
+    """Entrar al SCT por la ruta en caché si existe; si falla, por el buscador del portal"""
+    if not options.sin_ruta_directa and navigate_to_sct_direct(driver, wait, cuit):
+        return True
+    return navigate_to_sct(driver, wait, cuit, max_attempts=3)
+
+@traced("try_close_popup", check_result=False)
 def try_close_popup(driver, wait, max_attempts=3):
     """Intentar cerrar el popup si existe, con múltiples intentos"""
     for attempt in range(max_attempts):
@@ -285,14 +1677,12 @@ def try_close_popup(driver, wait, max_attempts=3):
             actions = ActionChains(driver)
             actions.move_to_element(close_button).pause(random.uniform(0.5, 1.0)).perform()
             close_button.click()
-            time.sleep(random.uniform(0.5, 1.0))
             print("Ventana emergente cerrada correctamente")
             
             # Verificar si el popup realmente se cerró
             try:
                 # Si el botón ya no está visible, el popup se cerró correctamente
-                WebDriverWait(driver, 2).until_not(EC.presence_of_element_located(
-                    (By.XPATH, "//*[@id='noticias']/div/a")))
+                wait_step(driver, "popup.cerrado")
                 print("Confirmado: el popup se cerró correctamente")
                 return True
             except:
@@ -326,6 +1716,7 @@ def select_option_by_text(driver, element, text):
         print(f"Error al seleccionar opción por texto: {str(e)}")
         return False
 
+@traced("select_cuit_contribuyente")
 def select_cuit_contribuyente(driver, wait, cuit_contribuyente):
     """Seleccionar el CUIT Contribuyente del desplegable"""
     try:
@@ -333,7 +1724,7 @@ def select_cuit_contribuyente(driver, wait, cuit_contribuyente):
         
         # Esperar a que el desplegable esté disponible usando el selector correcto
         # El select está dentro de un div con ID "cuitForm"
-        select_element = wait.until(EC.presence_of_element_located((By.XPATH, "//div[@id='cuitForm']/select[@name='$PropertySelection']")))
+        select_element = wait.until(EC.presence_of_element_located((By.XPATH, SCT_CUIT_SELECT_XPATH)))
         
         # Verificar si el CUIT ya está seleccionado
         selected_option = select_element.find_element(By.XPATH, ".//option[@selected='selected']")
@@ -349,7 +1740,7 @@ def select_cuit_contribuyente(driver, wait, cuit_contribuyente):
         if select_option_by_text(driver, select_element, cuit_contribuyente):
             # Esperar a que la página se actualice después de seleccionar el CUIT
             # El select tiene onchange="javascript:this.form.submit();" que envía el formulario automáticamente
-            time.sleep(random.uniform(1.5, 3.0))
+            wait_step(driver, "contribuyente.enviado", select_element)
             
             # Verificar si hay un diálogo de resubmisión y manejarlo
             try:
@@ -360,7 +1751,7 @@ def select_cuit_contribuyente(driver, wait, cuit_contribuyente):
                 actions = ActionChains(driver)
                 actions.move_to_element(resubmit_button).pause(random.uniform(0.3, 0.7)).perform()
                 resubmit_button.click()
-                time.sleep(random.uniform(2.0, 3.0))
+                wait_step(driver, "contribuyente.reenviado")
             except:
                 # No apareció el diálogo, continuamos normalmente
                 pass
@@ -380,7 +1771,7 @@ def select_cuit_contribuyente(driver, wait, cuit_contribuyente):
                     if cuit_contribuyente in option.text:
                         select.select_by_index(i)
                         print(f"CUIT seleccionado por índice: {option.text}")
-                        time.sleep(random.uniform(2.0, 3.0))
+                        wait_step(driver, "contribuyente.enviado", select_element)
                         
                         # Verificar si hay un popup y cerrarlo después de seleccionar el CUIT
                         try_close_popup(driver, wait)
@@ -396,8 +1787,25 @@ def select_cuit_contribuyente(driver, wait, cuit_contribuyente):
         print(f"Error al seleccionar CUIT Contribuyente: {str(e)}")
         return False
 
+def contribuyente_en_selector(driver, cuit_contribuyente):
+    """Verificar si el CUIT figura entre las opciones del desplegable.
+    
+    Devuelve None si no se pudo leer el desplegable.
+    """
+    try:
+        options = driver.find_elements(By.XPATH, SCT_CUIT_SELECT_XPATH + "/option")
+        if not options:
+            return None
+        return any(cuit_contribuyente in option.text for option in options)
+    except Exception:
+        return None
+
+@traced("expandir_impuestos_y_exportar")
 def expandir_impuestos_y_exportar(driver, wait, cuit_contribuyente, download_path):
-    """Expandir impuestos y exportar a XLSX"""
+    """Expandir impuestos y exportar a XLSX.
+    
+    Devuelve la ruta del archivo descargado, pendiente de post-procesamiento, o False.
+    """
     try:
         print("Expandiendo impuestos y exportando a XLSX...")
 
@@ -406,47 +1814,715 @@ def expandir_impuestos_y_exportar(driver, wait, cuit_contribuyente, download_pat
         pdf_button = wait.until(EC.element_to_be_clickable(
             (By.XPATH, "//*[@id='DataTables_Table_0_wrapper']/div[1]/a[2]")))
         
-        # Obtener el nombre del archivo original antes de hacer clic
-        original_files = os.listdir(download_path)
-        
-        # Mover el mouse al elemento antes de hacer clic
-        actions = ActionChains(driver)
-        actions.move_to_element(pdf_button).pause(random.uniform(0.5, 1.0)).perform()
-        pdf_button.click()
-        
-        # Esperar a que se descargue el archivo
-        print("Esperando a que se descargue el archivo XLSX...")
-        time.sleep(random.uniform(3.0, 5.0))
-        
-        # Verificar que se haya descargado el archivo
-        new_files = os.listdir(download_path)
-        downloaded_files = [f for f in new_files if f not in original_files]
-        
-        if downloaded_files:
-            # Renombrar el archivo descargado
-            for file in downloaded_files:
-                if file.endswith('.xlsx'):
-                    old_path = os.path.join(download_path, file)
-                    new_path = os.path.join(download_path, f"{cuit_contribuyente}_pantalla inicial sct.xlsx")
-                    
-                    # Si ya existe un archivo con ese nombre, eliminarlo
-                    if os.path.exists(new_path):
-                        os.remove(new_path)
-                        
-                    os.rename(old_path, new_path)
-                    print(f"PDF guardado como: {cuit_contribuyente}_pantalla inicial sct.xlsx")
-                    return True
+        with DownloadWatcher(driver, download_path) as watcher:
+            # Mover el mouse al elemento antes de hacer clic
+            actions = ActionChains(driver)
+            actions.move_to_element(pdf_button).pause(random.uniform(0.5, 1.0)).perform()
+            pdf_button.click()
             
-            print("Se descargó un archivo, pero no tiene extensión de XLSX (.xlsx)")
-            return False
-        else:
-            print("No se detectó ningún archivo descargado")
-            return False
+            # Esperar a que se descargue el archivo
+            print("Esperando a que se descargue el archivo XLSX...")
+            try:
+                downloaded = watcher.wait_for_file()
+            except TimeoutException as e:
+                print(f"No se detectó ningún archivo descargado: {str(e)}")
+                return False
+            
+            if watcher.suggested_filename and not watcher.suggested_filename.endswith('.xlsx'):
+                print(f"Se descargó un archivo, pero no tiene extensión de XLSX (.xlsx): {watcher.suggested_filename}")
+                return False
+            
+            # Entregar el archivo completo al post-procesamiento: solo se mueve fuera
+            # de la carpeta del trabajo, junto a su destino final (oculto hasta que se
+            # renombre); el renombrado final y la validación se hacen fuera del hilo
+            # del navegador
+            staged_path = os.path.join(download_path, f".sct_{watcher.guid}.xlsx")
+            os.replace(downloaded, staged_path)
+            print(f"XLSX descargado para el CUIT {cuit_contribuyente} (descarga {watcher.guid})")
+            return staged_path
         
     except Exception as e:
         print(f"Error al expandir impuestos y exportar a xlsx: {str(e)}")
         return False
 
+# Script que lee la tabla del SCT en una sola llamada: usa la API de DataTables
+# si está disponible y, si no, recorre el DOM de la tabla.
+EXTRACT_TABLE_SCRIPT = """
+const table = document.querySelector('#DataTables_Table_0') || document.querySelector('table.dataTable');
+if (!table) { return null; }
+const clean = (value) => {
+    const div = document.createElement('div');
+    // Conservar los saltos de línea de las celdas de dos renglones (Concepto / Subconcepto)
+    div.innerHTML = value == null ? '' : String(value).replace(/<br\\s*\\/?>/gi, '\\n');
+    return div.textContent.trim();
+};
+const columns = Array.from(table.querySelectorAll('thead th')).map(th => th.textContent.trim());
+let rows;
+if (window.jQuery && jQuery.fn.dataTable && jQuery.fn.dataTable.isDataTable(table)) {
+    const api = jQuery(table).DataTable();
+    const sources = api.columns().dataSrc().toArray();
+    rows = api.rows({search: 'applied'}).data().toArray().map(
+        row => Array.isArray(row) ? row.map(clean) : sources.map(key => clean(row[key])));
+} else {
+    rows = Array.from(table.querySelectorAll('tbody tr'))
+        .filter(tr => !tr.querySelector('td.dataTables_empty'))
+        .map(tr => Array.from(tr.cells).map(td => clean(td.innerHTML)));
+}
+return {columns: columns, rows: rows};
+"""
+
+@traced("extraer_tabla_sct")
+def extraer_tabla_sct(driver, wait):
+    """Leer la tabla del SCT directamente desde la página.
+    
+    Devuelve (columnas, registros): los encabezados se devuelven aparte para que
+    una tabla sin filas (contribuyente sin deudas) conserve sus columnas.
+    """
+    print("Extrayendo la tabla del SCT desde la página...")
+    wait.until(EC.presence_of_element_located((By.ID, SCT_TABLE_WRAPPER_ID)))
+    data = driver.execute_script(EXTRACT_TABLE_SCRIPT)
+    if not data:
+        print("No se encontró la tabla del SCT en la página")
+        return None
+    
+    columns = list(data["columns"])
+    records = []
+    for row in data["rows"]:
+        # Completar encabezados faltantes para filas con más celdas que columnas
+        columns += [f"columna_{i+1}" for i in range(len(columns), len(row))]
+        records.append(dict(zip(columns, row)))
+    print(f"Tabla extraída: {len(records)} filas")
+    return columns, records
+
+def guardar_tabla_sct(records, cuit_contribuyente, download_path, formato, nombre="pantalla inicial sct",
+                      columns=None):
+    """Guardar los registros extraídos en el formato pedido y devolver la ruta del archivo"""
+    if formato == "ninguno":
+        return None
+    
+    df = pd.DataFrame(records, columns=columns)
+    path = os.path.join(download_path, f"{cuit_contribuyente}_{nombre}.{formato}")
+    if formato == "xlsx":
+        df.to_excel(path, index=False)
+    elif formato == "csv":
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    elif formato == "parquet":
+        # Requiere pyarrow o fastparquet instalado
+        df.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Formato de salida desconocido: {formato}")
+    print(f"Tabla guardada como: {os.path.basename(path)}")
+    return path
+
+def add_months(period, months):
+    """Sumar meses a un período (datetime del primer día del mes)"""
+    index = period.year * 12 + period.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def period_windows(desde, hasta, paso):
+    """Partir el rango AAAAMM desde-hasta en ventanas de hasta `paso` meses.
+    
+    Lanza ValueError si los períodos no tienen el formato AAAAMM o están invertidos.
+    """
+    start = datetime.strptime(desde, "%Y%m")
+    end = datetime.strptime(hasta, "%Y%m")
+    if end < start:
+        raise ValueError(f"El período final {hasta} es anterior al inicial {desde}")
+    windows = []
+    while start <= end:
+        last = min(add_months(start, max(1, paso) - 1), end)
+        windows.append((start.strftime("%Y%m"), last.strftime("%Y%m")))
+        start = add_months(last, 1)
+    return windows
+
+def export_name(options):
+    """Nombre del archivo de salida: pantalla inicial o consulta histórica por períodos"""
+    if options.periodos:
+        return f"historico sct {options.periodos[0]}-{options.periodos[1]}"
+    return "pantalla inicial sct"
+
+def aplicar_filtro_periodos(driver, wait, desde, hasta, impuesto=None):
+    """Completar el filtro de períodos (y opcionalmente el impuesto) y consultar"""
+    # La página ya cargó: si el formulario no está, no tiene sentido esperarlo
+    if not filtro_periodos_disponible(driver):
+        print("La página del SCT no tiene el formulario de filtro por período")
+        return False
+    try:
+        for field, value in (("desde", desde), ("hasta", hasta)):
+            element = wait.until(EC.element_to_be_clickable((By.ID, SCT_FILTER_IDS[field])))
+            element.clear()
+            INPUT_ENGINE.type(driver, element, value)
+        if impuesto is not None:
+            select = Select(driver.find_element(By.ID, SCT_FILTER_IDS["impuesto"]))
+            select.select_by_value(impuesto)
+        button = driver.find_element(By.ID, SCT_FILTER_IDS["consultar"])
+        button.click()
+        wait_step(driver, "historico.consulta", button)
+        return True
+    except Exception as e:
+        print(f"Error al aplicar el filtro de períodos {desde}-{hasta}: {str(e)}")
+        return False
+
+@traced("exportar_historico")
+def exportar_historico(driver, wait, cuit_contribuyente, options):
+    """Consultar cada ventana de períodos (y cada impuesto pedido) en la misma sesión.
+    
+    Devuelve (columnas, registros): la unión de los encabezados y los registros
+    de todas las consultas sin filas repetidas (las ventanas pueden solaparse en
+    vencimientos y anticipos), o None si falla.
+    """
+    desde, hasta = options.periodos
+    impuestos = options.impuestos or [None]
+    columns = []
+    records = []
+    seen = set()
+    for window_desde, window_hasta in period_windows(desde, hasta, options.periodos_paso):
+        for impuesto in impuestos:
+            RATE_GOVERNOR.acquire("exportacion")
+            etiqueta = f"{window_desde}-{window_hasta}" + (f" impuesto {impuesto}" if impuesto else "")
+            if not aplicar_filtro_periodos(driver, wait, window_desde, window_hasta, impuesto):
+                return None
+            table = extraer_tabla_sct(driver, wait)
+            if table is None:
+                return None
+            page_columns, page = table
+            columns.extend(c for c in page_columns if c not in columns)
+            nuevos = 0
+            for record in page:
+                key = tuple(sorted((k, str(v)) for k, v in record.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                records.append(record)
+                nuevos += 1
+            print(f"Períodos {etiqueta}: {len(page)} filas ({nuevos} nuevas)")
+    print(f"Consulta histórica del CUIT {cuit_contribuyente}: {len(records)} filas sin repetir")
+    return columns, records
+
+def exportar_contribuyente(driver, wait, cuit_contribuyente, download_path, options):
+    """Obtener la pantalla inicial del SCT según el modo de extracción elegido.
+    
+    Devuelve una tupla (descarga, registros, columnas): en el modo xlsx, la ruta
+    del archivo descargado pendiente de post-procesamiento; en el modo tabla, los
+    registros leídos de la página y sus encabezados. Con --periodos, los registros
+    de todas las consultas históricas. Si la exportación falla, descarga y
+    registros son None.
+    """
+    if options.periodos:
+        table = exportar_historico(driver, wait, cuit_contribuyente, options)
+        if table is None:
+            return None, None, None
+        columns, records = table
+        return None, records, columns
+    RATE_GOVERNOR.acquire("exportacion")
+    if options.extraccion == "tabla":
+        table = extraer_tabla_sct(driver, wait)
+        if table is None:
+            return None, None, None
+        columns, records = table
+        return None, records, columns
+    
+    staged_path = expandir_impuestos_y_exportar(driver, wait, cuit_contribuyente, download_path)
+    if not staged_path:
+        return None, None, None
+    return staged_path, None, None
+
+# --- Exportación en varias pestañas ---------------------------------------
+# Con --pestanas K > 1 los contribuyentes de un mismo login se reparten entre K
+# pestañas del SCT de la misma sesión: mientras una pestaña recarga después de
+# elegir un contribuyente, se atiende a las demás.
+
+SCT_TAB_STATE_SCRIPT = """
+const select = document.querySelector("#cuitForm select[name='$PropertySelection']");
+const popup = document.querySelector('#noticias');
+const option = select && select.selectedIndex >= 0 ? select.options[select.selectedIndex] : null;
+return {
+    ready: document.readyState === 'complete' && !window.__sctPendingRequests,
+    sct: !!(select || document.querySelector('#DataTables_Table_0_wrapper')),
+    seleccionado: option ? option.text : null,
+    pendiente: window.__sctTabPending || null,
+    popup: !!(popup && popup.getClientRects().length),
+};
+"""
+
+# Elegir la opción y disparar el onchange del desplegable, que envía el formulario.
+# La marca queda en la página vieja: hasta que carga la nueva, el desplegable ya
+# muestra el CUIT elegido pero la tabla es la del contribuyente anterior
+SCT_TAB_SELECT_SCRIPT = """
+const select = document.querySelector("#cuitForm select[name='$PropertySelection']");
+if (!select) { return null; }
+const option = Array.from(select.options).find(o => o.text.includes(arguments[0]));
+if (!option) { return false; }
+window.__sctTabPending = arguments[0];
+select.value = option.value;
+select.dispatchEvent(new Event('change'));
+return true;
+"""
+
+class SctTab:
+    """Pestaña del SCT con el contribuyente asignado y el momento de la asignación"""
+    def __init__(self, handle):
+        self.handle = handle
+        self.cuit = None
+        self.submitted = False
+        self.since = time.monotonic()
+    
+    def assign(self, cuit):
+        self.cuit = cuit
+        self.submitted = False
+        self.since = time.monotonic()
+
+def close_popup_if_present(driver):
+    """Cerrar el popup de noticias si está visible, sin esperar a que aparezca"""
+    for link in driver.find_elements(By.XPATH, "//*[@id='noticias']/div/a"):
+        if link.is_displayed():
+            link.click()
+            return True
+    return False
+
+@traced("exportar_en_pestanas", check_result=False)
+def exportar_en_pestanas(driver, wait, contribuyentes, download_path, options, on_result):
+    """Exportar los contribuyentes de un login usando varias pestañas del SCT en ronda.
+    
+    Se parte de la pestaña del SCT activa y se abren hasta options.pestanas - 1
+    más con la misma URL. Cada pestaña elige su contribuyente, se exporta cuando
+    la página lo muestra y toma el siguiente pendiente. Una pestaña que supera
+    options.pestanas_timeout informa su contribuyente como error y se recarga.
+    Al terminar queda una sola pestaña del SCT activa, para close_sct_tab.
+    """
+    sct_url = driver.current_url
+    pending = deque(contribuyentes)
+    tabs = [SctTab(driver.current_window_handle)]
+    for _ in range(min(options.pestanas, len(contribuyentes)) - 1):
+        driver.switch_to.new_window("tab")
+        prepare_tab(driver)
+        # Navegación sin bloquear: la pestaña carga mientras se atienden las demás
+        driver.execute_script("window.location.href = arguments[0];", sct_url)
+        tabs.append(SctTab(driver.current_window_handle))
+    print(f"Exportando {len(contribuyentes)} contribuyentes en {len(tabs)} pestañas del SCT...")
+    for tab in tabs:
+        tab.assign(pending.popleft())
+    
+    def release(tab):
+        """Asignar el próximo pendiente a la pestaña o cerrarla si ya no hay trabajo"""
+        if pending:
+            tab.assign(pending.popleft())
+            return
+        tabs.remove(tab)
+        if tabs:
+            driver.close()
+        else:
+            last_handle[0] = tab.handle
+    last_handle = [tabs[0].handle]
+    
+    while tabs:
+        progressed = False
+        for tab in list(tabs):
+            driver.switch_to.window(tab.handle)
+            TRACER.context["cuit_contribuyente"] = tab.cuit
+            state = driver.execute_script(SCT_TAB_STATE_SCRIPT)
+            
+            if state["ready"] and state["sct"]:
+                if state["popup"]:
+                    close_popup_if_present(driver)
+                # Solo una página nueva (sin la marca del envío) tiene la tabla del CUIT elegido
+                if tab.cuit in (state["seleccionado"] or "") and not state["pendiente"]:
+                    print(f"Pestaña lista para el CUIT Contribuyente {tab.cuit}")
+                    descarga, records, columns = exportar_contribuyente(driver, wait, tab.cuit, download_path, options)
+                    if descarga is None and records is None:
+                        on_result(tab.cuit, "error", None, export_failure_reason(driver, options))
+                    else:
+                        on_result(tab.cuit, "ok", descarga, "", records, columns)
+                    release(tab)
+                    progressed = True
+                    continue
+                if not tab.submitted:
+                    found = driver.execute_script(SCT_TAB_SELECT_SCRIPT, tab.cuit)
+                    if found is False:
+                        print(f"El CUIT {tab.cuit} no figura en el desplegable")
+                        on_result(tab.cuit, "error", None, "contribuyente_inexistente")
+                        release(tab)
+                    elif found is None:
+                        # La página del SCT no tiene el desplegable de contribuyentes
+                        print(f"La pestaña del CUIT {tab.cuit} no muestra el desplegable de contribuyentes")
+                        on_result(tab.cuit, "error", None, "seleccion_contribuyente")
+                        driver.execute_script("window.location.href = arguments[0];", sct_url)
+                        release(tab)
+                    elif found:
+                        tab.submitted = True
+                        tab.since = time.monotonic()
+                    progressed = True
+                    continue
+            
+            if time.monotonic() - tab.since > options.pestanas_timeout:
+                print(f"La pestaña del CUIT {tab.cuit} superó {options.pestanas_timeout:.0f} s. Se recarga.")
+                on_result(tab.cuit, "error", None, "timeout_pestana")
+                driver.execute_script("window.location.href = arguments[0];", sct_url)
+                release(tab)
+                progressed = True
+        if not progressed:
+            time.sleep(0.2)
+    
+    driver.switch_to.window(last_handle[0])
+    return True
+
+# --- Post-procesamiento de exportaciones ----------------------------------
+# El hilo del navegador solo entrega la descarga (o los registros leídos) y sigue
+# con el próximo contribuyente; un pool acotado de hilos renombra, lee, valida y
+# guarda cada resultado.
+
+SCT_COLUMNS = ["Impuesto", "Concepto / Subconcepto", "Ant. / Cuota", "Período Fiscal",
+               "Fecha de Vencimiento", "Saldo", "Int. resarcitorios", "Int. punitorios"]
+
+def normalize_column(name):
+    """Normalizar un encabezado (espacios y saltos de línea, mayúsculas)"""
+    return " ".join(str(name).split()).lower()
+
+def leer_tabla_sct_xlsx(path):
+    """Leer el XLSX exportado por el SCT como DataFrame.
+    
+    El botón de DataTables agrega una fila de título antes de los encabezados, por
+    eso se busca la fila que contiene "Impuesto" y se usa como encabezado.
+    """
+    raw = pd.read_excel(path, header=None, dtype=str)
+    header_row = 0
+    for i, row in raw.iterrows():
+        if any(normalize_column(v) == "impuesto" for v in row.tolist() if isinstance(v, str)):
+            header_row = i
+            break
+    df = raw.iloc[header_row + 1:].reset_index(drop=True)
+    df.columns = [" ".join(str(c).split()) for c in raw.iloc[header_row].tolist()]
+    return df.dropna(how="all")
+
+def validar_tabla_sct(df):
+    """Devolver la lista de columnas esperadas que faltan en la tabla"""
+    present = {normalize_column(c) for c in df.columns}
+    return [c for c in SCT_COLUMNS if normalize_column(c) not in present]
+
+# --- Base consolidada de resultados ----------------------------------------
+
+def parse_importe(value):
+    """Convertir un importe con formato argentino ("11.100.440,72") a float"""
+    if value is None:
+        return None
+    text = str(value).strip().replace("$", "").replace(" ", "").replace("\n", "")
+    if not text or text.lower() == "nan":
+        return None
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def parse_fecha(value):
+    """Convertir una fecha dd/mm/aaaa (o ISO) a texto ISO aaaa-mm-dd"""
+    text = str(value).strip() if value is not None else ""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text[:10], fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def parse_entero(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+def split_codigo(value):
+    """Separar "217 - SICORE-IMPTO.A LAS GANANCIAS" en (217, "SICORE-IMPTO.A LAS GANANCIAS")"""
+    text = " ".join(str(value).split()) if value is not None else ""
+    code, sep, name = text.partition(" - ")
+    if sep and code.isdigit():
+        return int(code), name
+    return None, text or None
+
+def normalizar_tabla_sct(df):
+    """Normalizar la tabla del SCT a filas con columnas tipadas.
+    
+    La celda "Concepto / Subconcepto" trae ambos valores en dos líneas.
+    """
+    columns = {normalize_column(c): c for c in df.columns}
+    def column(name):
+        return columns.get(normalize_column(name))
+    
+    rows = []
+    for record in df.to_dict("records"):
+        def get(name):
+            key = column(name)
+            value = record.get(key) if key is not None else None
+            # Las celdas vacías llegan de pandas como NaN
+            if isinstance(value, float) and math.isnan(value):
+                return None
+            return value
+        
+        concepto_cell = str(get("Concepto / Subconcepto") or "")
+        lines = [line.strip() for line in concepto_cell.splitlines() if line.strip()]
+        concepto_codigo, concepto = split_codigo(lines[0] if lines else None)
+        subconcepto_codigo, subconcepto = split_codigo(lines[1] if len(lines) > 1 else None)
+        impuesto_codigo, impuesto = split_codigo(get("Impuesto"))
+        if impuesto is None and concepto is None:
+            continue
+        rows.append({
+            "impuesto_codigo": impuesto_codigo,
+            "impuesto": impuesto,
+            "concepto_codigo": concepto_codigo,
+            "concepto": concepto,
+            "subconcepto_codigo": subconcepto_codigo,
+            "subconcepto": subconcepto,
+            "anticipo_cuota": str(get("Ant. / Cuota") or "").strip() or None,
+            "periodo": parse_entero(get("Período Fiscal")),
+            "vencimiento": parse_fecha(get("Fecha de Vencimiento")),
+            "saldo": parse_importe(get("Saldo")),
+            "int_resarcitorios": parse_importe(get("Int. resarcitorios")),
+            "int_punitorios": parse_importe(get("Int. punitorios")),
+        })
+    return rows
+
+SCT_ROW_KEY = ["impuesto_codigo", "concepto_codigo", "subconcepto_codigo", "anticipo_cuota", "periodo"]
+SCT_ROW_VALUES = ["vencimiento", "saldo", "int_resarcitorios", "int_punitorios"]
+
+def diff_tablas_sct(previous, current):
+    """Diferencias por fila entre dos tablas normalizadas: deudas nuevas, canceladas y saldos modificados"""
+    def index(rows):
+        return {tuple(row[k] for k in SCT_ROW_KEY): row for row in rows}
+    before = index(previous)
+    after = index(current)
+    diffs = []
+    for key, row in after.items():
+        old = before.get(key)
+        if old is None:
+            diffs.append({"tipo": "nueva", **{k: row[k] for k in SCT_ROW_KEY}, "impuesto": row["impuesto"],
+                          "saldo_anterior": None, "saldo_nuevo": row["saldo"]})
+        elif any(old[v] != row[v] for v in SCT_ROW_VALUES):
+            diffs.append({"tipo": "modificada", **{k: row[k] for k in SCT_ROW_KEY}, "impuesto": row["impuesto"],
+                          "saldo_anterior": old["saldo"], "saldo_nuevo": row["saldo"],
+                          "campos": [v for v in SCT_ROW_VALUES if old[v] != row[v]]})
+    for key, row in before.items():
+        if key not in after:
+            diffs.append({"tipo": "cancelada", **{k: row[k] for k in SCT_ROW_KEY}, "impuesto": row["impuesto"],
+                          "saldo_anterior": row["saldo"], "saldo_nuevo": None})
+    return diffs
+
+class ChangeReport:
+    """Reporte JSONL de la corrida con una línea por cada fila que cambió"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+    
+    def write(self, corrida, cuit_ingreso, cuit_contribuyente, diffs):
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            for diff in diffs:
+                entry = {"corrida": corrida, "cuit_ingreso": cuit_ingreso, "cuit_contribuyente": cuit_contribuyente}
+                entry.update(diff)
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+class SctStore:
+    """Base SQLite consolidada con los saldos del SCT de todas las corridas.
+    
+    Las exportaciones se agregan a la tabla sct_saldos con columnas tipadas e
+    índices por CUIT y período. sct_estados guarda el hash de cada contribuyente
+    por corrida y, en corrida_datos, la corrida cuyas filas representan ese
+    estado (si no hubo cambios, no se duplican las filas). Por ejemplo:
+    
+        SELECT s.cuit_contribuyente, SUM(s.saldo) FROM sct_estados e
+        JOIN sct_saldos s ON s.corrida = e.corrida_datos AND s.cuit_contribuyente = e.cuit_contribuyente
+        WHERE e.corrida = ? GROUP BY s.cuit_contribuyente HAVING SUM(s.saldo) > 100000
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sct_saldos (
+        corrida TEXT NOT NULL,
+        fecha_corrida TEXT NOT NULL,
+        cuit_ingreso TEXT,
+        cuit_contribuyente TEXT NOT NULL,
+        impuesto_codigo INTEGER,
+        impuesto TEXT,
+        concepto_codigo INTEGER,
+        concepto TEXT,
+        subconcepto_codigo INTEGER,
+        subconcepto TEXT,
+        anticipo_cuota TEXT,
+        periodo INTEGER,
+        vencimiento TEXT,
+        saldo REAL,
+        int_resarcitorios REAL,
+        int_punitorios REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_sct_saldos_cuit ON sct_saldos (cuit_contribuyente, periodo);
+    CREATE INDEX IF NOT EXISTS idx_sct_saldos_periodo ON sct_saldos (periodo);
+    CREATE INDEX IF NOT EXISTS idx_sct_saldos_corrida ON sct_saldos (corrida);
+    CREATE TABLE IF NOT EXISTS sct_estados (
+        cuit_contribuyente TEXT NOT NULL,
+        corrida TEXT NOT NULL,
+        hash TEXT NOT NULL,
+        corrida_datos TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        PRIMARY KEY (cuit_contribuyente, corrida)
+    );
+    """
+    COLUMNS = ["impuesto_codigo", "impuesto", "concepto_codigo", "concepto", "subconcepto_codigo", "subconcepto",
+               "anticipo_cuota", "periodo", "vencimiento", "saldo", "int_resarcitorios", "int_punitorios"]
+    
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+    
+    def connect(self):
+        # Cada llamada abre su propia conexión: la usan varios hilos y procesos
+        return sqlite3.connect(self.path, timeout=30)
+    
+    @classmethod
+    def hash_rows(cls, rows):
+        """Hash del contenido normalizado, independiente del orden de las filas"""
+        canonical = sorted(json.dumps([row[c] for c in cls.COLUMNS], ensure_ascii=False) for row in rows)
+        return hashlib.sha256("\n".join(canonical).encode("utf-8")).hexdigest()
+    
+    def _insert_rows(self, conn, corrida, fecha_corrida, cuit_ingreso, cuit_contribuyente, rows):
+        names = ["corrida", "fecha_corrida", "cuit_ingreso", "cuit_contribuyente"] + self.COLUMNS
+        sql = f"INSERT INTO sct_saldos ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        values = [(corrida, fecha_corrida, cuit_ingreso, cuit_contribuyente) + tuple(row[c] for c in self.COLUMNS)
+                  for row in rows]
+        conn.execute("DELETE FROM sct_saldos WHERE corrida = ? AND cuit_contribuyente = ?",
+                     (corrida, cuit_contribuyente))
+        conn.executemany(sql, values)
+    
+    def _rows(self, conn, corrida, cuit_contribuyente):
+        cursor = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM sct_saldos "
+                              "WHERE corrida = ? AND cuit_contribuyente = ?", (corrida, cuit_contribuyente))
+        return [dict(zip(self.COLUMNS, values)) for values in cursor.fetchall()]
+    
+    def record_state(self, corrida, fecha_corrida, cuit_ingreso, cuit_contribuyente, rows):
+        """Comparar la tabla con la última corrida guardada del contribuyente y registrarla.
+        
+        Devuelve (estado, diferencias) con estado "nuevo", "modificado" o "sin_cambios".
+        Si no cambió, las filas no se vuelven a guardar: la corrida apunta a los
+        datos de la corrida anterior.
+        """
+        digest = self.hash_rows(rows)
+        conn = self.connect()
+        try:
+            with conn:
+                previous = conn.execute(
+                    "SELECT hash, corrida_datos FROM sct_estados WHERE cuit_contribuyente = ? AND corrida <> ? "
+                    "ORDER BY corrida DESC LIMIT 1", (cuit_contribuyente, corrida)).fetchone()
+                if previous and previous[0] == digest:
+                    state, data_run, diffs = "sin_cambios", previous[1], []
+                else:
+                    state = "modificado" if previous else "nuevo"
+                    data_run = corrida
+                    diffs = diff_tablas_sct(self._rows(conn, previous[1], cuit_contribuyente), rows) if previous else []
+                    self._insert_rows(conn, corrida, fecha_corrida, cuit_ingreso, cuit_contribuyente, rows)
+                conn.execute("INSERT OR REPLACE INTO sct_estados (cuit_contribuyente, corrida, hash, corrida_datos, estado) "
+                             "VALUES (?, ?, ?, ?, ?)", (cuit_contribuyente, corrida, digest, data_run, state))
+        finally:
+            conn.close()
+        return state, diffs
+
+def finalize_export(task):
+    """Tarea de post-procesamiento: leer, validar, detectar cambios, renombrar y guardar.
+    
+    Si la tabla no cambió respecto de la corrida anterior y el archivo anterior
+    existe, no se vuelve a guardar. Actualiza task["result"] con el archivo final,
+    la cantidad de filas, el estado y el resultado de la comparación.
+    """
+    result = task["result"]
+    cuit_contribuyente = result["cuit_contribuyente"]
+    download_path = task["download_path"]
+    nombre = task.get("nombre", "pantalla inicial sct")
+    
+    if task["descarga"]:
+        df = leer_tabla_sct_xlsx(task["descarga"])
+        archivo = os.path.join(download_path, f"{cuit_contribuyente}_{nombre}.xlsx")
+    else:
+        df = pd.DataFrame(task["registros"], columns=task.get("columnas"))
+        archivo = None
+        if task["formato"] != "ninguno":
+            archivo = os.path.join(download_path, f"{cuit_contribuyente}_{nombre}.{task['formato']}")
+    
+    result["filas"] = len(df)
+    missing = validar_tabla_sct(df)
+    changed = True
+    if missing:
+        result["estado"] = "error"
+        result["error"] = f"validacion: faltan columnas {', '.join(missing)}"
+        result["clase"] = classify_failure(result["error"])
+        result["fallos"].append(result["error"])
+        print(f"La tabla del CUIT {cuit_contribuyente} no tiene las columnas esperadas: {', '.join(missing)}")
+    elif task.get("consolidado"):
+        rows = normalizar_tabla_sct(df)
+        state, diffs = task["consolidado"].record_state(
+            task["corrida"], task["fecha_corrida"], result["cuit_ingreso"], cuit_contribuyente, rows)
+        result["cambios"] = state
+        result["diferencias"] = len(diffs)
+        changed = state != "sin_cambios"
+        if diffs and task.get("reporte"):
+            task["reporte"].write(task["corrida"], result["cuit_ingreso"], cuit_contribuyente, diffs)
+        if changed:
+            print(f"CUIT {cuit_contribuyente}: {state} ({len(diffs)} diferencias)")
+        else:
+            print(f"CUIT {cuit_contribuyente}: sin cambios respecto de la corrida anterior")
+    
+    # Guardar el archivo solo si cambió o si no existe uno anterior. Con workers
+    # el archivo anterior está en la carpeta de descargas principal, no en la del worker
+    anterior = archivo and os.path.join(task.get("destino") or download_path, os.path.basename(archivo))
+    if not changed and anterior and os.path.exists(anterior):
+        if task["descarga"]:
+            os.remove(task["descarga"])
+        archivo = anterior
+    elif task["descarga"]:
+        os.replace(task["descarga"], archivo)
+    elif archivo:
+        archivo = guardar_tabla_sct(task["registros"], cuit_contribuyente, download_path, task["formato"], nombre,
+                                    task.get("columnas"))
+    result["archivo"] = archivo
+    task["tabla"] = df
+    return task
+
+class PostProcessor:
+    """Pipeline productor/consumidor para el post-procesamiento de las exportaciones.
+    
+    submit() bloquea cuando hay max_pending tareas en curso, así la cola no crece
+    sin límite si el post-procesamiento es más lento que el navegador.
+    """
+    def __init__(self, workers=2, max_pending=8, on_done=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="postproceso")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.on_done = on_done
+        self.futures = []
+    
+    def submit(self, task):
+        self.slots.acquire()
+        future = self.executor.submit(self._run, task)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+        return future
+    
+    def _run(self, task):
+        try:
+            finalize_export(task)
+        except Exception as e:
+            # La descarga ya no se puede reprocesar: el fallo es permanente y el
+            # archivo intermedio se descarta para no dejar restos en la carpeta
+            if task["descarga"] and os.path.exists(task["descarga"]):
+                os.remove(task["descarga"])
+            result = task["result"]
+            result["estado"] = "error"
+            result["error"] = f"postproceso: {type(e).__name__}: {str(e)}"
+            result["clase"] = classify_failure(result["error"])
+            result["fallos"].append(result["error"])
+            print(f"Error en el post-procesamiento del CUIT {result['cuit_contribuyente']}: {str(e)}")
+        if self.on_done:
+            self.on_done(task)
+        return task
+    
+    def close(self):
+        """Esperar a que terminen todas las tareas pendientes"""
+        self.executor.shutdown(wait=True)
+
 def close_sct_tab(driver):
     """Cerrar la pestaña del SCT y volver a la pestaña principal"""
     try:
@@ -456,13 +2532,14 @@ def close_sct_tab(driver):
         
         # Cambiar a la pestaña original (ARCA)
         driver.switch_to.window(driver.window_handles[0])
-        time.sleep(random.uniform(1.0, 2.0))
+        wait_step(driver, "sct.pestana_cerrada")
         
         return True
     except Exception as e:
         print(f"Error al cerrar la pestaña del SCT: {str(e)}")
         return False
 
+@traced("logout_afip")
 def logout_afip(driver, wait):
     """Cerrar sesión en AFIP/ARCA"""
     try:
@@ -477,17 +2554,15 @@ def logout_afip(driver, wait):
         actions = ActionChains(driver)
         actions.move_to_element(user_icon).pause(random.uniform(0.5, 1.0)).perform()
         user_icon.click()
-        time.sleep(random.uniform(1.0, 2.0))
         
         # Hacer clic en el botón de cerrar sesión
-        logout_button = wait.until(EC.element_to_be_clickable(
-            (By.XPATH, "//*[@id='contBtnContribuyente']/div[6]/button/div/div[2]")))
+        logout_button = wait_step(driver, "logout.menu")
         
         # Mover el mouse al botón de cerrar sesión antes de hacer clic
         actions = ActionChains(driver)
         actions.move_to_element(logout_button).pause(random.uniform(0.5, 1.0)).perform()
         logout_button.click()
-        time.sleep(random.uniform(2.0, 3.0))
+        wait_step(driver, "logout.completado", logout_button)
         
         print("Sesión cerrada correctamente")
         return True
@@ -495,110 +2570,1198 @@ def logout_afip(driver, wait):
         print(f"Error al cerrar sesión: {str(e)}")
         return False
 
-def main():
-    """Función principal"""
-    # Configuración de rutas
-    excel_path = r"C:\Users\eze\Downloads\CREDENCIALES.xlsx"
-    download_path = r"C:\Users\eze\Downloads"
+def worker_side_file(path, worker_id):
+    """Archivo propio de cada worker, para no mezclar escrituras entre procesos"""
+    return f"{path}.worker{worker_id}"
+
+def merge_worker_side_files(path):
+    """Agregar al archivo JSONL principal el contenido de los archivos de cada worker y borrarlos"""
+    for side_path in sorted(glob.glob(glob.escape(path) + ".worker*")):
+        with open(side_path, "rb") as src, open(path, "ab") as dst:
+            data = src.read()
+            if data and not data.endswith(b"\n"):
+                data += b"\n"
+            dst.write(data)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(side_path)
+
+class RunJournal:
+    """Diario de ejecución append-only (JSONL) con el estado de cada fila.
     
-    # Verificar que el archivo Excel existe
-    if not os.path.exists(excel_path):
-        print(f"Error: No se encontró el archivo Excel en {excel_path}")
-        return
+    Cada línea registra una fila procesada; al cargarlo, la última entrada de cada
+    clave (CUIT Ingreso, CUIT Contribuyente, fecha de corrida, exportación) gana.
+    La exportación distingue la pantalla inicial de cada rango histórico. Las entradas
+    se indexan en un diccionario para consultas O(1). Cada escritura se hace con
+    flush + fsync y una línea truncada por un corte se ignora al leer.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        # El post-procesamiento registra entradas desde otros hilos
+        self.lock = threading.Lock()
     
-    # Leer credenciales
-    credentials = read_credentials(excel_path)
-    if not credentials:
-        print("No se pudieron obtener credenciales válidas. Verifique el archivo Excel.")
-        return
+    # Las entradas anteriores al campo "exportacion" son de la pantalla inicial
+    DEFAULT_EXPORT = "pantalla inicial sct"
     
-    print(f"Se encontraron {len(credentials)} registros para procesar.")
+    @staticmethod
+    def key(cuit_ingreso, cuit_contribuyente, fecha, exportacion=DEFAULT_EXPORT):
+        return (str(cuit_ingreso), str(cuit_contribuyente), fecha, exportacion)
+    
+    @classmethod
+    def entry_key(cls, entry):
+        return cls.key(entry["cuit_ingreso"], entry["cuit_contribuyente"], entry["fecha"],
+                       entry.get("exportacion") or cls.DEFAULT_EXPORT)
+    
+    def worker_path(self, worker_id):
+        return worker_side_file(self.path, worker_id)
+    
+    def _files(self):
+        return [path for path in [self.path] + sorted(glob.glob(glob.escape(self.path) + ".worker*"))
+                if os.path.exists(path)]
+    
+    def load(self):
+        """Cargar el diario principal y los de workers que no llegaron a fusionarse"""
+        for path in self._files():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Línea incompleta por un corte durante la escritura
+                        continue
+                    self.entries[self.entry_key(entry)] = entry
+        return self
+    
+    def record(self, entry, path=None):
+        """Agregar una entrada al diario de forma segura ante cortes"""
+        path = path or self.path
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock, open(path, "a+b") as f:
+            # Si la última línea quedó truncada, empezar en una línea nueva
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[self.entry_key(entry)] = entry
+    
+    def status(self, cuit_ingreso, cuit_contribuyente, fecha, exportacion=DEFAULT_EXPORT):
+        entry = self.entries.get(self.key(cuit_ingreso, cuit_contribuyente, fecha, exportacion))
+        return entry["estado"] if entry else None
+    
+    def pending(self, credentials, fecha, exportacion=DEFAULT_EXPORT):
+        """Filtrar las filas que todavía no se exportaron correctamente en la fecha y exportación indicadas"""
+        return [row for row in credentials if self.status(row[0], row[2], fecha, exportacion) != "ok"]
     
-    # Inicializar el driver una sola vez para todos los CUIT
-    driver = None
+    def merge_worker_files(self):
+        """Pasar al diario principal las entradas escritas por los workers"""
+        merge_worker_side_files(self.path)
+
+def journal_entry(result, fecha, inicio, duracion, exportacion=RunJournal.DEFAULT_EXPORT):
+    """Armar la entrada del diario a partir del resultado de una fila"""
+    return {
+        "cuit_ingreso": result["cuit_ingreso"],
+        "cuit_contribuyente": result["cuit_contribuyente"],
+        "fecha": fecha,
+        "exportacion": exportacion,
+        "estado": result["estado"],
+        "archivo": result["archivo"],
+        "error": result["error"],
+        "worker": result["worker"],
+        "intento": result.get("intentos", 1),
+        "cambios": result.get("cambios"),
+        "escritura": result.get("escritura"),
+        "inicio": inicio,
+        "duracion": round(duracion, 3),
+    }
+
+@traced("start_browser")
+def start_browser(download_path, options):
+    """Iniciar un navegador nuevo posicionado en la página de login de AFIP.
     
+    El span registra el tiempo desde setup_driver hasta el login interactivo.
+    """
+    profile = None
+    if options.perfil_cache:
+        profile = ProfileTemplate(options.perfil_cache, options.perfil_max_mb, options.perfil_max_horas).clone()
     try:
-        # Configurar el driver
-        driver = setup_driver(download_path)
+        driver = setup_driver(download_path, headless=options.headless, user_data_dir=profile)
+    except Exception:
+        if profile:
+            shutil.rmtree(profile, ignore_errors=True)
+        raise
+    driver.profile_clone = profile
+    
+    # Configurar espera explícita
+    wait = WebDriverWait(driver, 20)
+    
+    # Navegar a la página de AFIP
+    driver.get(options.login_url)
+    if not options.headless:
+        driver.maximize_window()
+    wait_step(driver, "login.pagina")
+    return driver, wait
+
+class DriverManager:
+    """Ciclo de vida del navegador: relanzamiento y reciclado preventivo.
+    
+    Recicla Chrome cada max_rows CUIT procesados o cuando el árbol de procesos de
+    chromedriver + Chrome supera max_rss_mb de memoria. El reemplazo se lanza en
+    segundo plano y queda esperando en la página de login, y el cambio se hace
+    entre grupos de credenciales (fuera de una sesión en curso).
+    """
+    def __init__(self, download_path, options, prefix="", worker_id=None):
+        self.download_path = download_path
+        self.options = options
+        self.prefix = prefix
+        self.worker_id = worker_id
+        self.max_rows = options.reciclar_cada
+        self.max_rss_mb = options.memoria_max_mb
+        self.driver = None
+        self.wait = None
+        self.rows = 0
+        self.spare = None
+        self.spare_thread = None
+        if self.max_rss_mb and psutil is None:
+            print(f"{prefix}psutil no está instalado: no se controlará la memoria del navegador")
+    
+    def acquire(self):
+        """Devolver (driver, wait, nuevo); nuevo indica que no hay sesión iniciada"""
+        if self.driver is not None and driver_is_alive(self.driver):
+            return self.driver, self.wait, False
+        if self.driver is not None:
+            print(f"{self.prefix}El navegador dejó de responder. Reiniciando...")
+            self._quit(self.driver)
+        self.driver, self.wait = self._take_spare() or start_browser(self.download_path, self.options)
+        self.rows = 0
+        return self.driver, self.wait, True
+    
+    def usage(self):
+        """Memoria (MB) y handles abiertos de chromedriver y sus procesos hijos"""
+        if psutil is None or self.driver is None:
+            return None, None
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except Exception:
+            return None, None
+        rss = 0
+        handles = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+                handles += process.num_handles() if hasattr(process, "num_handles") else process.num_fds()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return rss / (1024 * 1024), handles
+    
+    def rows_done(self, count, logged_in=False):
+        """Registrar filas procesadas y reciclar el navegador si corresponde.
         
-        # Configurar espera explícita
-        wait = WebDriverWait(driver, 20)
+        Con logged_in, antes de descartar el navegador se cierra su sesión en AFIP,
+        para que el login del reemplazo no choque con una sesión abierta. El
+        reemplazo no se lanza acá: lo toma (o lo inicia) el próximo acquire(), que
+        corre dentro del manejo de errores de cada grupo.
+        Devuelve True si se descartó el navegador (la sesión anterior se pierde).
+        """
+        self.rows += count
+        rss_mb, handles = self.usage()
+        by_rows = self.max_rows and self.rows >= self.max_rows
+        by_memory = self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb
+        near_limit = (self.max_rows and self.rows >= self.max_rows * 0.8) or \
+                     (self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb * 0.8)
         
-        # Navegar a la página de AFIP
-        driver.get("https://auth.afip.gob.ar/contribuyente_/login.xhtml")
-        driver.maximize_window()
+        if by_rows or by_memory:
+            motivo = f"{self.rows} CUIT" if by_rows else f"{rss_mb:.0f} MB, {handles} handles"
+            print(f"{self.prefix}Reciclando el navegador ({motivo})...")
+            old = self.driver
+            self.driver = None
+            if logged_in and driver_is_alive(old):
+                # Se cierra la sesión antes de que el reemplazo haga su login
+                try:
+                    # Cerrar pestañas del SCT que hayan quedado abiertas y volver al portal
+                    while len(old.window_handles) > 1:
+                        old.switch_to.window(old.window_handles[-1])
+                        old.close()
+                    old.switch_to.window(old.window_handles[0])
+                    logout_afip(old, self.wait)
+                except Exception as e:
+                    print(f"{self.prefix}No se pudo cerrar la sesión del navegador reciclado: {str(e)}")
+            threading.Thread(target=self._quit, args=(old,), daemon=True).start()
+            return True
+        if near_limit:
+            # Preparar el reemplazo mientras se sigue trabajando con el navegador actual
+            self._launch_spare()
+        return False
+    
+    def _launch_spare(self):
+        if self.spare_thread is not None:
+            return
+        # El hilo del reemplazo tiene su propio contexto de trazas: solo el worker,
+        # sin el CUIT que procesa el hilo principal en este momento
+        context = {"worker": self.worker_id}
+        def _launch():
+            TRACER.context = dict(context)
+            try:
+                self.spare = start_browser(self.download_path, self.options)
+            except Exception as e:
+                print(f"{self.prefix}No se pudo preparar el navegador de reemplazo: {str(e)}")
+                self.spare = None
+        self.spare_thread = threading.Thread(target=_launch, daemon=True)
+        self.spare_thread.start()
+    
+    def _take_spare(self):
+        if self.spare_thread is None:
+            return None
+        self.spare_thread.join()
+        spare, self.spare, self.spare_thread = self.spare, None, None
+        if spare and driver_is_alive(spare[0]):
+            print(f"{self.prefix}Usando el navegador de reemplazo ya iniciado")
+            return spare
+        return None
+    
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        profile = getattr(driver, "profile_clone", None)
+        if profile:
+            shutil.rmtree(profile, ignore_errors=True)
+    
+    def quit(self):
+        if self.driver is not None:
+            self._quit(self.driver)
+            self.driver = None
+        spare = self._take_spare()
+        if spare:
+            self._quit(spare[0])
+
+def driver_is_alive(driver):
+    """Verificar si el navegador sigue respondiendo"""
+    try:
+        driver.window_handles
+        return True
+    except Exception:
+        return False
+
+def reset_to_login(driver, login_url=LOGIN_URL):
+    """Cerrar todas las pestañas excepto la primera y volver a la página de login"""
+    try:
+        while len(driver.window_handles) > 1:
+            driver.switch_to.window(driver.window_handles[-1])
+            driver.close()
+            time.sleep(1)
+        driver.switch_to.window(driver.window_handles[0])
         
-        # Procesar cada CUIT
-        for i, (cuit_ingresar, password, cuit_contribuyente) in enumerate(credentials):
-            print(f"\nProcesando CUIT: {cuit_ingresar} ({i+1}/{len(credentials)})")
-            print(f"CUIT Contribuyente a seleccionar: {cuit_contribuyente}")
+        # Volver a la página de inicio de AFIP
+        driver.get(login_url)
+        wait_step(driver, "login.pagina")
+    except Exception as e:
+        print(f"Error al intentar recuperarse: {str(e)}")
+
+def group_credentials(credentials):
+    """Agrupar las filas por login (CUIT Ingreso + clave) respetando el orden original.
+    
+    Devuelve una lista de tuplas (cuit_ingreso, clave, [cuit_contribuyente, ...]).
+    """
+    groups = {}
+    for cuit_ingresar, password, cuit_contribuyente in credentials:
+        groups.setdefault((cuit_ingresar, password), []).append(cuit_contribuyente)
+    return [(cuit_ingresar, password, contribuyentes)
+            for (cuit_ingresar, password), contribuyentes in groups.items()]
+
+def process_group(driver, wait, cuit_ingresar, password, contribuyentes, download_path, options, needs_logout, on_result):
+    """Procesar todos los contribuyentes de un mismo login con una única sesión.
+    
+    Hace un solo login y una sola navegación al SCT, y luego selecciona y exporta
+    cada contribuyente. Por cada uno llama a
+    on_result(cuit_contribuyente, estado, descarga, mensaje, registros, columnas).
+    """
+    # Si ya hubo un login anterior en este navegador, cerrar sesión primero
+    if needs_logout:
+        if not logout_afip(driver, wait):
+            print(f"No se pudo cerrar la sesión anterior. Refrescando la página...")
+            driver.get(options.login_url)
+            wait_step(driver, "login.pagina")
+    
+    # Login en AFIP
+    if not login_afip(driver, cuit_ingresar, password, wait):
+        print(f"No se pudo completar el login para el CUIT {cuit_ingresar}. Continuando con el siguiente.")
+        motivo = "login_rechazado" if login_rejected(driver) else "login"
+        for cuit_contribuyente in contribuyentes:
+            on_result(cuit_contribuyente, "error", None, motivo)
+        return
+    
+    # Navegar al Sistema de Cuentas Tributarias con manejo de errores de autenticación
+    if not open_sct(driver, wait, cuit_ingresar, options):
+        print(f"No se pudo navegar al Sistema de Cuentas Tributarias para el CUIT {cuit_ingresar}. Continuando con el siguiente.")
+        for cuit_contribuyente in contribuyentes:
+            on_result(cuit_contribuyente, "error", None, "navegacion_sct")
+        return
+    
+    if options.pestanas > 1 and len(contribuyentes) > 1:
+        exportar_en_pestanas(driver, wait, contribuyentes, download_path, options, on_result)
+    else:
+        for j, cuit_contribuyente in enumerate(contribuyentes):
+            print(f"CUIT Contribuyente a seleccionar: {cuit_contribuyente} ({j+1}/{len(contribuyentes)})")
+            TRACER.context["cuit_contribuyente"] = cuit_contribuyente
+            
+            # Seleccionar el CUIT Contribuyente del desplegable
+            if not select_cuit_contribuyente(driver, wait, cuit_contribuyente):
+                print(f"No se pudo seleccionar el CUIT Contribuyente {cuit_contribuyente}. Continuando con el siguiente.")
+                if contribuyente_en_selector(driver, cuit_contribuyente) is False:
+                    on_result(cuit_contribuyente, "error", None, "contribuyente_inexistente")
+                else:
+                    on_result(cuit_contribuyente, "error", None, "seleccion_contribuyente")
+                continue
+            
+            # Exportar la pantalla inicial (descarga XLSX o extracción directa de la tabla)
+            descarga, records, columns = exportar_contribuyente(driver, wait, cuit_contribuyente, download_path, options)
+            if descarga is None and records is None:
+                print(f"No se pudo exportar la pantalla inicial para el CUIT {cuit_contribuyente}. Continuando con el siguiente.")
+                on_result(cuit_contribuyente, "error", None, export_failure_reason(driver, options))
+                continue
+            
+            # Entregar el resultado al post-procesamiento y seguir con el próximo contribuyente
+            on_result(cuit_contribuyente, "ok", descarga, "", records, columns)
+    
+    # Cerrar la pestaña del SCT y volver a la pestaña principal
+    if not close_sct_tab(driver):
+        print(f"No se pudo cerrar la pestaña del SCT. Continuando con el siguiente CUIT.")
+        # Si hay un problema, intentar cerrar todas las pestañas excepto la primera
+        while len(driver.window_handles) > 1:
+            driver.switch_to.window(driver.window_handles[-1])
+            driver.close()
+            time.sleep(1)
+        driver.switch_to.window(driver.window_handles[0])
+
+# Clasificación de fallos: los permanentes no se reintentan
+TRANSIENT = "transitorio"
+PERMANENT = "permanente"
+PERMANENT_FAILURES = {"login_rechazado", "contribuyente_inexistente", "validacion", "postproceso",
+                      "filtro_periodos_no_disponible"}
+
+def classify_failure(motivo):
+    """Clasificar un motivo de fallo como transitorio o permanente.
+    
+    Los errores de red, timeouts, elementos obsoletos y el 401
+    AUTHENTICATION_ALREADY_PRESENT (que termina en navegacion_sct) son transitorios.
+    """
+    return PERMANENT if motivo.split(":")[0] in PERMANENT_FAILURES else TRANSIENT
+
+class RetryScheduler:
+    """Cola de trabajo con reintentos diferidos por backoff exponencial con jitter.
+    
+    Los reintentos quedan detrás del resto del trabajo listo, así el navegador no
+    espera ocioso a una cuenta con problemas.
+    """
+    def __init__(self, max_retries=3, base_delay=30.0, max_delay=600.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue = []
+        self.counter = itertools.count()
+    
+    def __len__(self):
+        return len(self.queue)
+    
+    def push(self, item, delay=0.0):
+        heapq.heappush(self.queue, (time.monotonic() + delay, next(self.counter), item))
+    
+    def pop(self):
+        """Sacar el próximo trabajo listo, esperando si solo quedan reintentos diferidos"""
+        ready_at, _, item = heapq.heappop(self.queue)
+        remaining = ready_at - time.monotonic()
+        if remaining > 0:
+            print(f"Solo quedan reintentos pendientes. Esperando {remaining:.0f} segundos...")
+            time.sleep(remaining)
+        return item
+    
+    def can_retry(self, attempt):
+        return attempt <= self.max_retries
+    
+    def backoff(self, attempt):
+        """Demora antes del intento attempt + 1 ("full jitter")"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+def change_report_path(download_path, run_date):
+    """Ruta por defecto del reporte de cambios de una fecha de corrida"""
+    return os.path.join(download_path, f"sct_cambios_{run_date}.jsonl")
+
+def configure_run(options):
+    """Configurar el estado global de la corrida (escritura, métricas, caché y ritmo)"""
+    load_heavy_imports()
+    INPUT_ENGINE.configure(options.perfil_escritura)
+    PAGE_METRICS.enabled = options.headless or options.medir_paginas
+    SCT_ROUTE_CACHE.configure(options.sct_cache)
+    RATE_GOVERNOR.configure(options.ritmo_estado, {"login": options.ritmo_login,
+                                                   "navegacion": options.ritmo_navegacion,
+                                                   "exportacion": options.ritmo_exportacion})
+
+def process_credentials(credentials, download_path, options=None, worker_id=None, manager=None, attempt=1):
+    """Procesar una lista de credenciales con un único navegador.
+    
+    Las filas se agrupan por login para reutilizar la sesión. Los fallos
+    transitorios se vuelven a encolar con backoff hasta agotar el presupuesto de
+    reintentos. Si el navegador muere, se relanza y solo se pierde el intento del
+    CUIT Contribuyente en curso: el resto del grupo se vuelve a encolar.
+    Con un manager ya iniciado (modo servicio) el navegador no se cierra al
+    terminar: se cierra la sesión y queda en la página de login. attempt es el
+    número del primer intento (el servicio reencola los reintentos en su cola).
+    Devuelve una lista de diccionarios con el resultado final de cada fila.
+    """
+    if options is None:
+        options = parse_args([])
+    if manager is None:
+        # En modo servicio se configura una sola vez al iniciar: reconfigurar por
+        # trabajo pisaría el estado adaptativo compartido por los demás
+        configure_run(options)
+    prefix = f"[Worker {worker_id}] " if worker_id is not None else ""
+    journal = RunJournal(options.journal) if options.journal else None
+    journal_path = None
+    if journal and worker_id is not None:
+        journal_path = journal.worker_path(worker_id)
+    results = []
+    failures = {}
+    scheduler = RetryScheduler(options.max_reintentos, options.backoff_base)
+    for group in group_credentials(credentials):
+        scheduler.push(group + (attempt,))
+    own_manager = manager is None
+    if own_manager:
+        manager = DriverManager(download_path, options, prefix, worker_id)
+    needs_logout = False
+    
+    store = SctStore(options.consolidado) if options.consolidado else None
+    report = None
+    if store and options.reporte_cambios:
+        report_path = options.reporte_cambios
+        if worker_id is not None:
+            report_path = worker_side_file(report_path, worker_id)
+        report = ChangeReport(report_path)
+    
+    def on_postprocessed(task):
+        if journal:
+            journal.record(journal_entry(task["result"], options.run_date, *task["tiempos"], export_name(options)),
+                           journal_path)
+    postprocessor = PostProcessor(options.postproceso_hilos, options.postproceso_cola, on_postprocessed)
+    
+    try:
+        while scheduler:
+            cuit_ingresar, password, contribuyentes, attempt = scheduler.pop()
+            print(f"\n{prefix}Procesando CUIT: {cuit_ingresar} ({len(contribuyentes)} contribuyentes, "
+                  f"intento {attempt}, {len(results)}/{len(credentials)} registros procesados)")
+            
+            TRACER.context = {"worker": worker_id, "cuit_ingreso": cuit_ingresar,
+                              "cuit_contribuyente": None, "intento": attempt}
+            processed = []
+            retry = []
+            row_started = [datetime.now(), time.monotonic()]
+            def on_result(cuit_contribuyente, estado, descarga, mensaje, records=None, columns=None):
+                processed.append(cuit_contribuyente)
+                history = failures.setdefault((cuit_ingresar, cuit_contribuyente), [])
+                clase = None
+                if estado != "ok":
+                    history.append(mensaje)
+                    clase = classify_failure(mensaje)
+                    if clase == TRANSIENT and scheduler.can_retry(attempt):
+                        retry.append(cuit_contribuyente)
+                        estado = "reintento"
+                result = {
+                    "cuit_ingreso": cuit_ingresar,
+                    "cuit_contribuyente": cuit_contribuyente,
+                    "worker": worker_id,
+                    "estado": estado,
+                    "archivo": None,
+                    "error": mensaje,
+                    "clase": clase,
+                    "intentos": attempt,
+                    "fallos": list(history),
+                    "escritura": INPUT_ENGINE.describe(),
+                    "registros": records,
+                }
+                if estado != "reintento":
+                    results.append(result)
+                tiempos = (row_started[0].isoformat(timespec="seconds"), time.monotonic() - row_started[1])
+                if estado == "ok":
+                    # El diario se escribe cuando termina el post-procesamiento
+                    # La consulta histórica no es un estado de la pantalla inicial: no se consolida
+                    postprocessor.submit({"result": result, "descarga": descarga, "registros": records,
+                                          "columnas": columns,
+                                          "download_path": download_path, "destino": options.download_path,
+                                          "formato": options.formato_salida,
+                                          "nombre": export_name(options),
+                                          "consolidado": None if options.periodos else store,
+                                          "reporte": report, "corrida": options.run_started,
+                                          "fecha_corrida": options.run_date, "tiempos": tiempos})
+                elif journal:
+                    journal.record(journal_entry(result, options.run_date, *tiempos, export_name(options)),
+                                   journal_path)
+                row_started[:] = [datetime.now(), time.monotonic()]
             
             try:
-                # Si no es el primer CUIT y ya estamos logueados, cerrar sesión primero
-                if i > 0:
-                    # Cerrar sesión
-                    if not logout_afip(driver, wait):
-                        print(f"No se pudo cerrar la sesión anterior. Refrescando la página...")
-                        driver.get("https://auth.afip.gob.ar/contribuyente_/login.xhtml")
-                        time.sleep(random.uniform(3.0, 5.0))
-                
-                # Login en AFIP
-                if not login_afip(driver, cuit_ingresar, password, wait):
-                    print(f"No se pudo completar el login para el CUIT {cuit_ingresar}. Continuando con el siguiente.")
-                    continue
-                
-                # Navegar al Sistema de Cuentas Tributarias con manejo de errores de autenticación
-                if not navigate_to_sct(driver, wait, cuit_ingresar, max_attempts=3):
-                    print(f"No se pudo navegar al Sistema de Cuentas Tributarias para el CUIT {cuit_ingresar}. Continuando con el siguiente.")
-                    continue
-                
-                # Seleccionar el CUIT Contribuyente del desplegable
-                if not select_cuit_contribuyente(driver, wait, cuit_contribuyente):
-                    print(f"No se pudo seleccionar el CUIT Contribuyente {cuit_contribuyente}. Continuando con el siguiente.")
-                    # Cerrar la pestaña del SCT y volver a la pestaña principal
-                    close_sct_tab(driver)
-                    continue
+                # (Re)iniciar el navegador si no existe o dejó de responder
+                driver, wait, fresh = manager.acquire()
+                if fresh:
+                    needs_logout = False
                 
-                # NUEVO FLUJO: Expandir impuestos y exportar a PDF
-                if not expandir_impuestos_y_exportar(driver, wait, cuit_contribuyente, download_path):
-                    print(f"No se pudo expandir impuestos y exportar a PDF para el CUIT {cuit_contribuyente}. Continuando con el siguiente.")
-                    # Continuar aunque no se pueda expandir impuestos y exportar a PDF
-                
-                # Cerrar la pestaña del SCT y volver a la pestaña principal
-                if not close_sct_tab(driver):
-                    print(f"No se pudo cerrar la pestaña del SCT. Continuando con el siguiente CUIT.")
-                    # Si hay un problema, intentar cerrar todas las pestañas excepto la primera
-                    while len(driver.window_handles) > 1:
-                        driver.switch_to.window(driver.window_handles[-1])
-                        driver.close()
-                        time.sleep(1)
-                    driver.switch_to.window(driver.window_handles[0])
+                process_group(driver, wait, cuit_ingresar, password, contribuyentes,
+                              download_path, options, needs_logout, on_result)
+                needs_logout = True
                 
             except Exception as e:
-                print(f"Error procesando CUIT {cuit_ingresar}: {str(e)}")
+                print(f"{prefix}Error procesando CUIT {cuit_ingresar}: {str(e)}")
+                needs_logout = False
+                
+                # Solo falla el contribuyente en curso; el resto del grupo sigue en el mismo intento
+                remaining = [c for c in contribuyentes if c not in processed]
+                if remaining:
+                    on_result(remaining[0], "error", None, f"{type(e).__name__}: {str(e)}")
+                    if remaining[1:]:
+                        scheduler.push((cuit_ingresar, password, remaining[1:], attempt))
                 
                 # Intentar recuperarse para el siguiente CUIT
+                if manager.driver is not None and driver_is_alive(manager.driver):
+                    reset_to_login(manager.driver, options.login_url)
+            
+            # Punto seguro entre grupos para reciclar el navegador
+            if manager.rows_done(len(processed), needs_logout):
+                needs_logout = False
+            
+            if retry:
+                delay = scheduler.backoff(attempt)
+                print(f"{prefix}Se reintentarán {len(retry)} contribuyentes del CUIT {cuit_ingresar} "
+                      f"en {delay:.0f} segundos (intento {attempt + 1})")
+                scheduler.push((cuit_ingresar, password, retry, attempt + 1), delay)
+    finally:
+        if own_manager:
+            # Cerrar el navegador al finalizar todos los CUIT
+            manager.quit()
+        elif needs_logout:
+            park_driver(manager, options)
+        postprocessor.close()
+    
+    return results
+
+def park_driver(manager, options):
+    """Cerrar la sesión y dejar el navegador en la página de login para el próximo trabajo"""
+    driver = manager.driver
+    if driver is None or not driver_is_alive(driver):
+        return
+    try:
+        if not logout_afip(driver, manager.wait):
+            reset_to_login(driver, options.login_url)
+    except Exception as e:
+        print(f"No se pudo dejar el navegador en la página de login: {str(e)}")
+
+def run_worker(worker_id, credentials, download_path, options):
+    """Punto de entrada de cada proceso worker: usa su propia subcarpeta de descargas"""
+    worker_path = os.path.join(download_path, f"worker_{worker_id}")
+    os.makedirs(worker_path, exist_ok=True)
+    if options.trace:
+        TRACER.configure(worker_side_file(options.trace, worker_id))
+    if options.metricas_navegador:
+        BROWSER_METRICS.configure(worker_side_file(options.metricas_navegador, worker_id))
+    results = process_credentials(credentials, worker_path, options, worker_id=worker_id)
+    return {"resultados": results, "esperas": WAIT_REPORT.samples, "spans": TRACER.spans}
+
+def shard_credentials(credentials, workers):
+    """Repartir las filas entre los workers sin separar los grupos de un mismo login.
+    
+    Los grupos más grandes se asignan primero al worker con menos filas.
+    """
+    shards = [[] for _ in range(workers)]
+    groups = sorted(group_credentials(credentials), key=lambda g: len(g[2]), reverse=True)
+    for cuit_ingresar, password, contribuyentes in groups:
+        shard = min(shards, key=len)
+        shard.extend((cuit_ingresar, password, c) for c in contribuyentes)
+    return shards
+
+def merge_worker_results(results, download_path):
+    """Mover los archivos de cada subcarpeta de worker a la carpeta de descargas principal"""
+    for result in results:
+        archivo = result.get("archivo")
+        if not archivo or not os.path.exists(archivo):
+            continue
+        destino = os.path.join(download_path, os.path.basename(archivo))
+        if os.path.abspath(archivo) != os.path.abspath(destino):
+            if os.path.exists(destino):
+                os.remove(destino)
+            shutil.move(archivo, destino)
+            result["archivo"] = destino
+    
+    # Eliminar las subcarpetas de workers que quedaron vacías
+    for name in os.listdir(download_path):
+        path = os.path.join(download_path, name)
+        if name.startswith("worker_") and os.path.isdir(path) and not os.listdir(path):
+            os.rmdir(path)
+    return results
+
+def run_parallel(credentials, download_path, workers, options):
+    """Procesar las credenciales con varios navegadores en procesos separados"""
+    shards = [shard for shard in shard_credentials(credentials, workers) if shard]
+    results = []
+    
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = {
+            executor.submit(run_worker, worker_id, shard, download_path, options): (worker_id, shard)
+            for worker_id, shard in enumerate(shards, start=1)
+        }
+        for future in as_completed(futures):
+            worker_id, shard = futures[future]
+            try:
+                worker_output = future.result()
+                worker_results = worker_output["resultados"]
+                print(f"[Worker {worker_id}] Finalizado: {len(worker_results)} registros")
+                results.extend(worker_results)
+                WAIT_REPORT.merge(worker_output["esperas"])
+                TRACER.spans.extend(worker_output["spans"])
+            except Exception as e:
+                # El proceso completo del worker murió: se marcan sus filas como fallidas
+                print(f"[Worker {worker_id}] Error fatal: {str(e)}")
+                for cuit_ingresar, _, cuit_contribuyente in shard:
+                    results.append({
+                        "cuit_ingreso": cuit_ingresar,
+                        "cuit_contribuyente": cuit_contribuyente,
+                        "worker": worker_id,
+                        "estado": "error",
+                        "archivo": None,
+                        "error": f"worker: {str(e)}",
+                        "clase": TRANSIENT,
+                        "intentos": 1,
+                        "fallos": [f"worker: {str(e)}"],
+                        "escritura": options.perfil_escritura,
+                        "registros": None,
+                    })
+    
+    return merge_worker_results(results, download_path)
+
+def print_summary(results, max_retries=None):
+    """Mostrar el resumen final del proceso"""
+    ok = [r for r in results if r["estado"] == "ok"]
+    failed = [r for r in results if r["estado"] != "ok"]
+    print(f"\nResumen: {len(ok)} exportados correctamente, {len(failed)} con errores.")
+    
+    changes = {}
+    for r in ok:
+        if r.get("cambios"):
+            changes[r["cambios"]] = changes.get(r["cambios"], 0) + 1
+    if changes:
+        print("Cambios respecto de la corrida anterior: " +
+              ", ".join(f"{estado}: {count}" for estado, count in sorted(changes.items())))
+    
+    # Fallos de todos los intentos por clase y motivo
+    counts = {}
+    for r in results:
+        for motivo in r.get("fallos", []):
+            key = (classify_failure(motivo), motivo.split(":")[0])
+            counts[key] = counts.get(key, 0) + 1
+    if counts:
+        recovered = sum(1 for r in ok if r.get("fallos"))
+        retries = sum(r.get("intentos", 1) - 1 for r in results)
+        budget = f" (máximo {max_retries} por fila)" if max_retries is not None else ""
+        print(f"Reintentos usados: {retries}{budget}; filas recuperadas tras reintentar: {recovered}")
+        print("Fallos por clase:")
+        for (clase, motivo), count in sorted(counts.items()):
+            print(f"  {clase:<12} {motivo:<28} {count:>5}")
+    
+    for r in failed:
+        print(f"  - {r['cuit_ingreso']} / {r['cuit_contribuyente']}: {r['error']} ({r.get('clase')}, {r.get('intentos', 1)} intentos)")
+
+def print_plan(credentials, workers):
+    """Mostrar los grupos de login y su reparto entre workers sin ejecutar nada"""
+    shards = shard_credentials(credentials, workers) if workers > 1 else [credentials]
+    for worker_id, shard in enumerate(shards, start=1):
+        if workers > 1:
+            print(f"\nWorker {worker_id}: {len(shard)} registros")
+        for cuit_ingresar, _, contribuyentes in group_credentials(shard):
+            print(f"  {cuit_ingresar}: {', '.join(contribuyentes)}")
+
+class SctService:
+    """Modo servicio: un pool de navegadores esperando en la página de login y una
+    API HTTP local para encolar trabajos.
+    
+    Cada trabajo indica CUIT Ingreso y CUIT Contribuyente; la clave se toma de la
+    planilla de credenciales (que se vuelve a leer si cambia), así nunca viaja por
+    la API. Cada navegador corre en su propio hilo con su DriverManager. Los
+    trabajos de un mismo CUIT Ingreso se procesan de a uno: AFIP rechaza dos
+    sesiones simultáneas del mismo usuario. Un fallo transitorio se reencola en
+    la cola del servicio con backoff, sin retener el navegador mientras espera.
+    Los trabajos terminados se descartan pasado JOB_TTL.
+    """
+    # Segundos que se conserva un trabajo terminado para consultarlo
+    JOB_TTL = 3600
+    # Spans y muestras de espera que se conservan en memoria
+    HISTORY_LIMIT = 5000
+    
+    def __init__(self, excel_path, download_path, options):
+        self.excel_path = excel_path
+        self.download_path = download_path
+        self.options = options
+        self.pool_size = max(1, options.workers)
+        self.queue = queue.Queue()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.passwords = {}
+        self.credentials_mtime = None
+        self.login_locks = {}
+        self.finished = {}
+        self.retries = RetryScheduler(options.max_reintentos, options.backoff_base)
+        self.timers = []
+        # El reporte de cambios por defecto es uno por día: se calcula con la fecha de cada trabajo
+        self.daily_report = options.reporte_cambios == change_report_path(download_path, options.run_date)
+        self.report_paths = {options.reporte_cambios} if options.reporte_cambios else set()
+        self.started = time.monotonic()
+        self.busy = {}
+        self.busy_seconds = 0.0
+        self.threads = []
+    
+    def password(self, cuit_ingreso):
+        """Clave del CUIT Ingreso según la planilla vigente"""
+        with self.lock:
+            mtime = os.path.getmtime(self.excel_path)
+            if mtime != self.credentials_mtime:
+                self.passwords = {row[0]: row[1] for row in read_credentials(self.excel_path)}
+                self.credentials_mtime = mtime
+            return self.passwords.get(cuit_ingreso)
+    
+    def login_lock(self, cuit_ingreso):
+        """Lock que serializa los trabajos de un CUIT Ingreso entre navegadores"""
+        with self.lock:
+            return self.login_locks.setdefault(cuit_ingreso, threading.Lock())
+    
+    def submit(self, cuit_ingreso, cuit_contribuyente):
+        """Encolar un trabajo; lanza ValueError si los datos no son válidos"""
+        cuit_ingreso = normalize_cuit(cuit_ingreso)
+        cuit_contribuyente = normalize_cuit(cuit_contribuyente)
+        for cuit in (cuit_ingreso, cuit_contribuyente):
+            if not cuit_valido(cuit):
+                raise ValueError(f"CUIT inválido: {cuit}")
+        if self.password(cuit_ingreso) is None:
+            raise ValueError(f"El CUIT Ingreso {cuit_ingreso} no está en la planilla de credenciales")
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "cuit_ingreso": cuit_ingreso,
+            "cuit_contribuyente": cuit_contribuyente,
+            "estado": "en_cola",
+            "creado": datetime.now().isoformat(timespec="seconds"),
+            "inicio": None,
+            "fin": None,
+            "intentos": 0,
+            "resultado": None,
+        }
+        with self.lock:
+            self.expire()
+            self.jobs[job["id"]] = job
+        self.queue.put(job["id"])
+        return dict(job)
+    
+    def expire(self):
+        """Descartar los trabajos terminados hace más de JOB_TTL (con el lock tomado)"""
+        limit = time.monotonic() - self.JOB_TTL
+        for job_id, finished in list(self.finished.items()):
+            if finished < limit:
+                del self.finished[job_id]
+                self.jobs.pop(job_id, None)
+    
+    def get(self, job_id, wait=0):
+        """Devolver el trabajo, esperando hasta wait segundos a que termine"""
+        deadline = time.monotonic() + wait
+        with self.done:
+            job = self.jobs.get(job_id)
+            while job and job["estado"] in ("en_cola", "procesando") and time.monotonic() < deadline:
+                self.done.wait(deadline - time.monotonic())
+            return dict(job) if job else None
+    
+    def status(self):
+        """Profundidad de la cola y utilización de los navegadores"""
+        with self.lock:
+            now = time.monotonic()
+            busy = self.busy_seconds + sum(now - since for since in self.busy.values())
+            states = {}
+            for job in self.jobs.values():
+                states[job["estado"]] = states.get(job["estado"], 0) + 1
+            uptime = now - self.started
+            return {
+                "cola": self.queue.qsize(),
+                "navegadores": self.pool_size,
+                "ocupados": len(self.busy),
+                "utilizacion": round(busy / (uptime * self.pool_size), 3) if uptime else 0,
+                "trabajos": states,
+                "activo_desde_s": round(uptime, 1),
+            }
+    
+    def worker(self, worker_id):
+        prefix = f"[Navegador {worker_id}] "
+        manager = DriverManager(self.download_path, self.options, prefix, worker_id)
+        try:
+            # Precalentar: el navegador queda esperando en la página de login
+            manager.acquire()
+            print(f"{prefix}Listo en la página de login")
+        except Exception as e:
+            print(f"{prefix}No se pudo iniciar el navegador: {str(e)}")
+        try:
+            while True:
+                job_id = self.queue.get()
+                if job_id is None:
+                    break
+                self.run_job(worker_id, manager, job_id)
+        finally:
+            manager.quit()
+    
+    def run_job(self, worker_id, manager, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job["estado"] = "procesando"
+            job["inicio"] = datetime.now().isoformat(timespec="seconds")
+            job["intentos"] += 1
+            attempt = job["intentos"]
+            self.busy[worker_id] = time.monotonic()
+        # Cada trabajo lleva su propia fecha de corrida: el servicio puede correr varios días
+        options = argparse.Namespace(**vars(self.options))
+        options.run_started = datetime.now().isoformat(timespec="seconds")
+        options.run_date = datetime.now().date().isoformat()
+        if self.daily_report:
+            options.reporte_cambios = change_report_path(self.download_path, options.run_date)
+        # Los reintentos se reencolan en la cola del servicio, no se esperan acá
+        options.max_reintentos = 0
+        started = time.monotonic()
+        try:
+            row = [job["cuit_ingreso"], self.password(job["cuit_ingreso"]), job["cuit_contribuyente"]]
+            with self.login_lock(job["cuit_ingreso"]):
+                results = process_credentials([row], self.download_path, options, worker_id, manager=manager,
+                                              attempt=attempt)
+            result = results[0] if results else None
+            estado = result["estado"] if result else "error"
+        except Exception as e:
+            print(f"[Navegador {worker_id}] Error en el trabajo {job_id}: {str(e)}")
+            result = {"error": f"{type(e).__name__}: {str(e)}"}
+            estado = "error"
+        delay = None
+        if estado != "ok" and result and result.get("clase") == TRANSIENT and self.retries.can_retry(attempt):
+            delay = self.retries.backoff(attempt)
+        with self.done:
+            if options.reporte_cambios:
+                self.report_paths.add(options.reporte_cambios)
+            job["duracion"] = round(time.monotonic() - started, 3)
+            job["resultado"] = {k: v for k, v in (result or {}).items() if k != "registros"}
+            self.busy_seconds += time.monotonic() - self.busy.pop(worker_id)
+            if delay is None:
+                job["estado"] = estado
+                job["fin"] = datetime.now().isoformat(timespec="seconds")
+                self.finished[job_id] = time.monotonic()
+            else:
+                job["estado"] = "en_cola"
+            self.done.notify_all()
+        TRACER.trim(self.HISTORY_LIMIT)
+        WAIT_REPORT.trim(self.HISTORY_LIMIT)
+        if delay is not None:
+            print(f"[Navegador {worker_id}] Trabajo {job_id}: {estado}. Se reintentará en {delay:.0f} segundos "
+                  f"(intento {attempt + 1})")
+            timer = threading.Timer(delay, self.queue.put, (job_id,))
+            timer.daemon = True
+            timer.start()
+            with self.lock:
+                self.timers = [t for t in self.timers if t.is_alive()] + [timer]
+            return
+        print(f"[Navegador {worker_id}] Trabajo {job_id} terminado: {estado} en {job['duracion']:.1f}s")
+    
+    def start(self):
+        for worker_id in range(1, self.pool_size + 1):
+            thread = threading.Thread(target=self.worker, args=(worker_id,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def stop(self):
+        with self.lock:
+            for timer in self.timers:
+                timer.cancel()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.options.journal:
+            merge_worker_side_files(self.options.journal)
+        if self.options.consolidado:
+            for path in sorted(self.report_paths):
+                merge_worker_side_files(path)
+    
+    def handler_class(self):
+        service = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def _json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/estado":
+                    return self._json(200, service.status())
+                if url.path.startswith("/trabajos/"):
+                    try:
+                        wait = float(query.get("esperar", ["0"])[0])
+                    except ValueError:
+                        wait = None
+                    if wait is None or not 0 <= wait:
+                        return self._json(400, {"error": "esperar debe ser una cantidad de segundos"})
+                    wait = min(wait, 300)
+                    job = service.get(url.path.rsplit("/", 1)[1], wait)
+                    return self._json(200, job) if job else self._json(404, {"error": "Trabajo inexistente"})
+                return self._json(404, {"error": "Ruta inexistente"})
+            
+            def do_POST(self):
+                if urlparse(self.path).path != "/trabajos":
+                    return self._json(404, {"error": "Ruta inexistente"})
                 try:
-                    # Cerrar todas las pestañas excepto la primera
-                    while len(driver.window_handles) > 1:
-                        driver.switch_to.window(driver.window_handles[-1])
-                        driver.close()
-                        time.sleep(1)
-                    driver.switch_to.window(driver.window_handles[0])
-                    
-                    # Volver a la página de inicio de AFIP
-                    driver.get("https://auth.afip.gob.ar/contribuyente_/login.xhtml")
-                    time.sleep(random.uniform(3.0, 5.0))
-                except Exception as e:
-                    print(f"Error al intentar recuperarse: {str(e)}")
+                    length = int(self.headers.get("Content-Length") or 0)
+                    data = json.loads(self.rfile.read(length) or b"{}")
+                    items = data if isinstance(data, list) else [data]
+                    jobs = [service.submit(item["cuit_ingreso"], item["cuit_contribuyente"]) for item in items]
+                except (ValueError, KeyError, TypeError) as e:
+                    return self._json(400, {"error": str(e)})
+                return self._json(202, jobs if isinstance(data, list) else jobs[0])
+        
+        return Handler
+    
+    def serve(self, host, port):
+        """Iniciar el pool y atender la API hasta Ctrl+C"""
+        self.start()
+        httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        httpd.daemon_threads = True
+        print(f"Servicio SCT escuchando en http://{host}:{port} con {self.pool_size} navegadores")
+        print("  POST /trabajos {\"cuit_ingreso\": ..., \"cuit_contribuyente\": ...}")
+        print("  GET  /trabajos/<id>?esperar=60 | GET /estado")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nDeteniendo el servicio...")
+        finally:
+            httpd.server_close()
+            self.stop()
+
+def parse_args(argv=None):
+    """Leer los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Exportar la pantalla inicial del Sistema de Cuentas Tributarias para cada fila de CREDENCIALES.xlsx")
+    parser.add_argument("--excel", default=DEFAULT_EXCEL_PATH,
+                        help="Ruta al archivo Excel de credenciales")
+    parser.add_argument("--download-path", default=DEFAULT_DOWNLOAD_PATH,
+                        help="Carpeta donde se guardan los archivos exportados")
+    parser.add_argument("--login-url", default=LOGIN_URL,
+                        help="Página de login de AFIP (por ejemplo, la del servidor de prueba mock_afip.py)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cantidad de navegadores en paralelo (uno por proceso)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Perfil liviano: Chrome sin ventana, viewport chico y bloqueo de recursos no esenciales")
+    parser.add_argument("--medir-paginas", action="store_true",
+                        help="Registrar bytes transferidos y tiempo de carga de cada página (siempre activo con --headless)")
+    parser.add_argument("--reciclar-cada", type=int, default=50,
+                        help="Reiniciar el navegador después de esta cantidad de CUIT (0 para no reciclar)")
+    parser.add_argument("--memoria-max-mb", type=int, default=1500,
+                        help="Reiniciar el navegador si chromedriver + Chrome superan esta memoria en MB "
+                             "(requiere psutil; 0 para desactivar)")
+    parser.add_argument("--perfil-cache", nargs="?", const="",
+                        help="Usar una plantilla de perfil de Chrome precalentada en esta carpeta "
+                             "(sin valor: .perfil_chrome en la carpeta de descargas)")
+    parser.add_argument("--perfil-max-mb", type=int, default=300,
+                        help="Tamaño máximo de la plantilla de perfil antes de volver a prepararla")
+    parser.add_argument("--perfil-max-horas", type=float, default=24,
+                        help="Antigüedad máxima de la plantilla de perfil antes de volver a prepararla")
+    parser.add_argument("--periodos", nargs=2, metavar=("DESDE", "HASTA"),
+                        help="Consulta histórica: recorrer los períodos AAAAMM DESDE-HASTA en la misma sesión "
+                             "y guardar un solo archivo por contribuyente")
+    parser.add_argument("--periodos-paso", type=int, default=12,
+                        help="Meses por consulta en el modo histórico")
+    parser.add_argument("--impuestos", nargs="+",
+                        help="Códigos de impuesto a consultar por separado en el modo histórico (por defecto todos)")
+    parser.add_argument("--pestanas", type=int, default=1,
+                        help="Pestañas del SCT en paralelo para los contribuyentes de un mismo login")
+    parser.add_argument("--pestanas-timeout", type=float, default=60.0,
+                        help="Segundos máximos que una pestaña puede tardar en mostrar su contribuyente")
+    parser.add_argument("--ritmo-login", type=float, default=10,
+                        help="Logins por minuto entre todos los navegadores (0 = sin límite)")
+    parser.add_argument("--ritmo-navegacion", type=float, default=20,
+                        help="Entradas al SCT por minuto entre todos los navegadores (0 = sin límite)")
+    parser.add_argument("--ritmo-exportacion", type=float, default=60,
+                        help="Exportaciones por minuto entre todos los navegadores (0 = sin límite)")
+    parser.add_argument("--ritmo-estado",
+                        help="Archivo compartido del limitador de ritmo (por defecto sct_ritmo.json en la carpeta de descargas)")
+    parser.add_argument("--servicio", action="store_true",
+                        help="Modo servicio: navegadores precalentados y API HTTP local de trabajos")
+    parser.add_argument("--servicio-host", default="127.0.0.1",
+                        help="Dirección de la API del modo servicio")
+    parser.add_argument("--servicio-puerto", type=int, default=8770,
+                        help="Puerto de la API del modo servicio")
+    parser.add_argument("--validar", action="store_true",
+                        help="Solo leer y validar la planilla de credenciales, sin abrir el navegador")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Mostrar qué filas se procesarían (y en qué worker) sin abrir el navegador")
+    parser.add_argument("--extraccion", choices=["xlsx", "tabla"], default="xlsx",
+                        help="xlsx: usar el botón de exportación; tabla: leer la tabla directamente desde la página")
+    parser.add_argument("--formato-salida", choices=["xlsx", "csv", "parquet", "ninguno"], default="xlsx",
+                        help="Formato del archivo a guardar en el modo --extraccion tabla")
+    parser.add_argument("--perfil-escritura", choices=InputEngine.PROFILES, default="human",
+                        help="human: tecla por tecla; fast: texto completo de una vez; "
+                             "adaptive: fast hasta detectar errores de autenticación")
+    parser.add_argument("--sct-cache",
+                        help="Archivo JSON con la ruta de entrada al SCT (por defecto sct_ruta.json en la carpeta de descargas)")
+    parser.add_argument("--sin-ruta-directa", action="store_true",
+                        help="Entrar siempre al SCT por el buscador del portal, sin usar la ruta en caché")
+    parser.add_argument("--consolidado",
+                        help="Base SQLite donde se acumulan los saldos de todas las corridas "
+                             "(por defecto sct_consolidado.sqlite en la carpeta de descargas)")
+    parser.add_argument("--sin-consolidado", action="store_true",
+                        help="No agregar los resultados a la base consolidada")
+    parser.add_argument("--reporte-cambios",
+                        help="Reporte JSONL con las diferencias por fila respecto de la corrida anterior "
+                             "(por defecto sct_cambios_<fecha>.jsonl en la carpeta de descargas)")
+    parser.add_argument("--postproceso-hilos", type=int, default=2,
+                        help="Hilos que renombran, leen y validan las exportaciones en paralelo al navegador")
+    parser.add_argument("--postproceso-cola", type=int, default=8,
+                        help="Máximo de exportaciones pendientes de post-procesar antes de frenar al navegador")
+    parser.add_argument("--max-reintentos", type=int, default=3,
+                        help="Reintentos por fila ante fallos transitorios (401, timeouts, elementos obsoletos)")
+    parser.add_argument("--backoff-base", type=float, default=30.0,
+                        help="Demora base en segundos del backoff exponencial entre reintentos")
+    parser.add_argument("--journal",
+                        help="Diario de ejecución JSONL (por defecto sct_journal.jsonl en la carpeta de descargas)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Procesar solo las filas pendientes o fallidas del diario para la fecha de hoy")
+    parser.add_argument("--trace",
+                        help="Guardar los spans de tiempo de cada paso en este archivo JSONL")
+    parser.add_argument("--chrome-trace",
+                        help="Exportar los spans en formato Trace Event de Chrome para verlos en una línea de tiempo")
+    parser.add_argument("--metricas-navegador",
+                        help="Archivo JSONL con métricas del navegador por paso (red, heap, DOM, layout/script)")
+    parser.add_argument("--comparar-metricas", nargs=2, metavar=("BASE", "NUEVO"),
+                        help="Comparar dos archivos de --metricas-navegador y salir")
+    parser.add_argument("--wait-report",
+                        help="Guardar en este archivo JSON los tiempos de espera medidos por paso")
+    args = parser.parse_args(argv)
+    # Fecha de la corrida, común a todos los workers aunque el proceso cruce la medianoche
+    args.run_started = datetime.now().isoformat(timespec="seconds")
+    args.run_date = args.run_started[:10]
+    return args
+
+def main(argv=None):
+    """Función principal. Devuelve la lista de resultados (None si no se procesó nada)"""
+    args = parse_args(argv)
+    if args.comparar_metricas:
+        compare_browser_metrics(*args.comparar_metricas)
+        return
+    excel_path = args.excel
+    download_path = args.download_path
+    
+    # Verificar que el archivo Excel existe
+    if not os.path.exists(excel_path):
+        print(f"Error: No se encontró el archivo Excel en {excel_path}")
+        return
+    
+    # Leer credenciales
+    credentials = read_credentials(excel_path)
+    if not credentials:
+        print("No se pudieron obtener credenciales válidas. Verifique el archivo Excel.")
+        return
+    
+    if args.periodos:
+        try:
+            windows = period_windows(*args.periodos, args.periodos_paso)
+        except ValueError as e:
+            print(f"Error en --periodos: {str(e)}")
+            return
+        print(f"Consulta histórica: {len(windows)} consultas por contribuyente "
+              f"({args.periodos[0]} a {args.periodos[1]})")
+    
+    print(f"Se encontraron {len(credentials)} registros para procesar.")
+    if args.validar:
+        print("\nValidación completada.")
+        return
+    print(f"Perfil de escritura: {args.perfil_escritura}")
+    
+    if not args.journal:
+        args.journal = os.path.join(download_path, "sct_journal.jsonl")
+    if not args.sct_cache:
+        args.sct_cache = os.path.join(download_path, "sct_ruta.json")
+    if not args.ritmo_estado:
+        args.ritmo_estado = os.path.join(download_path, "sct_ritmo.json")
+    if args.sin_consolidado:
+        args.consolidado = None
+    elif not args.consolidado:
+        args.consolidado = os.path.join(download_path, "sct_consolidado.sqlite")
+    if not args.reporte_cambios:
+        args.reporte_cambios = change_report_path(download_path, args.run_date)
+    journal = RunJournal(args.journal)
+    if args.resume:
+        journal.load()
+        journal.merge_worker_files()
+        pending = journal.pending(credentials, args.run_date, export_name(args))
+        print(f"Reanudando: {len(credentials) - len(pending)} registros ya exportados hoy, {len(pending)} pendientes.")
+        credentials = pending
+        if not credentials:
+            print("\nProceso completado.")
+            return
+    
+    if args.trace:
+        TRACER.configure(args.trace)
+    if args.metricas_navegador:
+        BROWSER_METRICS.configure(args.metricas_navegador)
+    
+    workers = max(1, min(args.workers, len(group_credentials(credentials))))
+    if args.dry_run:
+        print_plan(credentials, workers)
+        return
+    if args.perfil_cache is not None:
+        args.perfil_cache = args.perfil_cache or os.path.join(download_path, ".perfil_chrome")
+        # Se prepara una sola vez antes de lanzar los workers, que solo la clonan
+        template = ProfileTemplate(args.perfil_cache, args.perfil_max_mb, args.perfil_max_horas)
+        if not template.prime(download_path, args.login_url, headless=args.headless):
+            args.perfil_cache = None
+    if args.servicio:
+        configure_run(args)
+        SctService(excel_path, download_path, args).serve(args.servicio_host, args.servicio_puerto)
+        return
+    results = None
+    try:
+        if workers == 1:
+            results = process_credentials(credentials, download_path, args)
+        else:
+            print(f"Procesando con {workers} navegadores en paralelo...")
+            results = run_parallel(credentials, download_path, workers, args)
+            journal.merge_worker_files()
+            if args.trace:
+                merge_worker_side_files(args.trace)
+            if args.metricas_navegador:
+                merge_worker_side_files(args.metricas_navegador)
+            if args.consolidado:
+                merge_worker_side_files(args.reporte_cambios)
+        print_summary(results, args.max_reintentos)
+        TRACER.print_summary()
+        if args.chrome_trace:
+            TRACER.export_chrome_trace(args.chrome_trace)
+        WAIT_REPORT.print_summary()
+        if args.wait_report:
+            WAIT_REPORT.save(args.wait_report)
     except Exception as e:
         print(f"Error general: {str(e)}")
-    finally:
-        # Cerrar el navegador al finalizar todos los CUIT
-        if driver:
-            driver.quit()
     
     print("\nProceso completado.")
+    return results
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,181 @@
+"""Benchmark de extremo a extremo de SCTv1.py contra el servidor local mock_afip.py.
+
+Levanta el servidor de prueba, genera credenciales sintéticas con CUIT válidos,
+corre el flujo completo de SCTv1 y reporta CUITs por minuto, la latencia por
+paso (de las trazas) y el tiempo de recuperación de los fallos inyectados.
+El reporte se guarda en JSON y puede compararse con uno anterior.
+
+Uso:
+    python benchmark_sct.py -n 20 --por-login 4 --latencia 0.2 --prob-401 0.1 --headless
+    python benchmark_sct.py -n 20 --baseline bench_anterior.json -- --workers 2 --perfil-escritura fast
+
+Los argumentos después de "--" se pasan tal cual a SCTv1.py.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+import SCTv1
+from mock_afip import MockAfipServer
+
+def generar_cuit(rng, prefijo="20"):
+    """Generar un CUIT sintético con dígito verificador correcto"""
+    base = prefijo + f"{rng.randint(10_000_000, 99_999_999)}"
+    return base + str(SCTv1.digito_verificador(base))
+
+def generar_credenciales(path, cantidad, por_login, seed=0):
+    """Escribir un CSV de credenciales sintéticas y devolver los logins para el servidor"""
+    rng = random.Random(seed)
+    logins = {}
+    rows = []
+    while len(rows) < cantidad:
+        cuit_ingreso = generar_cuit(rng)
+        clave = f"clave{len(logins)}"
+        contribuyentes = [cuit_ingreso] + [generar_cuit(rng, "30") for _ in range(por_login - 1)]
+        contribuyentes = contribuyentes[:cantidad - len(rows)]
+        logins[cuit_ingreso] = {"clave": clave, "contribuyentes": contribuyentes}
+        rows.extend([cuit_ingreso, clave, cuit] for cuit in contribuyentes)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["CUIT Ingreso", "CLAVE Ingreso", "CUIT Contribuyente"])
+        writer.writerows(rows)
+    return logins
+
+def tiempos_recuperacion(journal_path):
+    """Segundos entre el primer fallo de una fila y su exportación correcta final.
+
+    Se lee el diario completo (no solo la última entrada por fila) para ver los
+    intentos intermedios.
+    """
+    historial = {}
+    if not os.path.exists(journal_path):
+        return []
+    with open(journal_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            historial.setdefault((entry["cuit_ingreso"], entry["cuit_contribuyente"]), []).append(entry)
+    tiempos = []
+    for entries in historial.values():
+        entries.sort(key=lambda e: e["inicio"])
+        fallos = [e for e in entries if e["estado"] != "ok"]
+        if not fallos or entries[-1]["estado"] != "ok":
+            continue
+        inicio = datetime.fromisoformat(fallos[0]["inicio"])
+        fin = datetime.fromisoformat(entries[-1]["inicio"]).timestamp() + entries[-1]["duracion"]
+        tiempos.append(round(fin - inicio.timestamp(), 3))
+    return tiempos
+
+def comparar(actual, base):
+    """Imprimir las diferencias entre dos reportes de benchmark"""
+    print("\n=== COMPARACIÓN CON LA LÍNEA BASE ===")
+    def delta(nuevo, viejo):
+        if not viejo:
+            return "-"
+        return f"{(nuevo - viejo) / viejo * 100:+.1f}%"
+    print(f"CUITs/minuto: {base['cuits_por_minuto']:.2f} -> {actual['cuits_por_minuto']:.2f} "
+          f"({delta(actual['cuits_por_minuto'], base['cuits_por_minuto'])})")
+    print(f"Duración: {base['duracion']:.1f}s -> {actual['duracion']:.1f}s "
+          f"({delta(actual['duracion'], base['duracion'])})")
+    pasos_base = {row["paso"]: row for row in base["pasos"]}
+    print(f"{'Paso':<35}{'p50 base':>10}{'p50':>10}{'dif':>10}")
+    for row in actual["pasos"]:
+        previo = pasos_base.get(row["paso"])
+        if previo is None:
+            print(f"{row['paso']:<35}{'-':>10}{row['p50']:>10.2f}{'nuevo':>10}")
+            continue
+        print(f"{row['paso']:<35}{previo['p50']:>10.2f}{row['p50']:>10.2f}{delta(row['p50'], previo['p50']):>10}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de SCTv1 contra el servidor local de prueba")
+    parser.add_argument("-n", "--cuits", type=int, default=10, help="Cantidad de contribuyentes a procesar")
+    parser.add_argument("--por-login", type=int, default=3, help="Contribuyentes por CUIT de ingreso")
+    parser.add_argument("--latencia", type=float, default=0.1, help="Demora media de cada pedido al servidor")
+    parser.add_argument("--latencia-export", type=float, default=0.0, help="Demora adicional de la descarga XLSX")
+    parser.add_argument("--prob-401", type=float, default=0.0, help="Probabilidad de HTTP 401 al entrar al SCT")
+    parser.add_argument("--prob-error-auth", type=float, default=0.0,
+                        help="Probabilidad de error de autenticación al entrar al SCT")
+    parser.add_argument("--popup", choices=["siempre", "primera", "nunca"], default="siempre")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de las credenciales sintéticas")
+    parser.add_argument("--directorio", help="Directorio de trabajo (por defecto uno temporal)")
+    parser.add_argument("--salida", help="Archivo JSON del reporte (por defecto en el directorio de trabajo)")
+    parser.add_argument("--baseline", help="Reporte JSON anterior para comparar")
+    parser.add_argument("--headless", action="store_true", help="Ejecutar Chrome sin interfaz gráfica")
+    args, extra = parser.parse_known_args(argv)
+    if extra and extra[0] == "--":
+        extra = extra[1:]
+    args.sct_args = extra
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = args.directorio or tempfile.mkdtemp(prefix="bench_sct_")
+    os.makedirs(workdir, exist_ok=True)
+    credenciales = os.path.join(workdir, "credenciales.csv")
+    journal = os.path.join(workdir, "sct_journal.jsonl")
+    logins = generar_credenciales(credenciales, args.cuits, args.por_login, args.seed)
+
+    server = MockAfipServer(latencia=args.latencia, latencia_export=args.latencia_export,
+                            prob_401=args.prob_401, prob_error_auth=args.prob_error_auth,
+                            popup=args.popup, logins=logins).start()
+    print(f"Servidor de prueba en {server.login_url}, directorio de trabajo {workdir}")
+
+    sct_args = ["--excel", credenciales, "--download-path", workdir, "--login-url", server.login_url,
+                "--journal", journal, "--backoff-base", "1"]
+    if args.headless:
+        sct_args.append("--headless")
+    sct_args += args.sct_args
+
+    start = time.monotonic()
+    try:
+        results = SCTv1.main(sct_args) or []
+    finally:
+        duracion = time.monotonic() - start
+        server.stop()
+
+    recuperacion = tiempos_recuperacion(journal)
+    ok = sum(1 for r in results if r["estado"] == "ok")
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("baseline", "salida", "directorio")},
+        "cuits": len(results),
+        "ok": ok,
+        "errores": len(results) - ok,
+        "duracion": round(duracion, 3),
+        "cuits_por_minuto": round(ok / duracion * 60, 3) if duracion else 0,
+        "pasos": SCTv1.TRACER.summary(),
+        "recuperacion": {
+            "casos": len(recuperacion),
+            "p50": SCTv1.percentile(recuperacion, 50) if recuperacion else None,
+            "max": max(recuperacion) if recuperacion else None,
+        },
+        "servidor": dict(server.stats),
+    }
+
+    print("\n=== BENCHMARK ===")
+    print(f"Contribuyentes: {reporte['cuits']} (ok: {ok}, errores: {reporte['errores']})")
+    print(f"Duración: {reporte['duracion']:.1f}s - {reporte['cuits_por_minuto']:.2f} CUITs/minuto")
+    print(f"Errores inyectados: {server.stats['errores_401']} HTTP 401, {server.stats['errores_auth']} de autenticación")
+    if recuperacion:
+        print(f"Recuperación de fallos: {len(recuperacion)} casos, p50 {reporte['recuperacion']['p50']:.1f}s, "
+              f"máx {reporte['recuperacion']['max']:.1f}s")
+
+    salida = args.salida or os.path.join(workdir, "benchmark_sct.json")
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"Reporte guardado en {salida}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparar(reporte, json.load(f))
+    return reporte
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""Servidor local que imita las páginas de AFIP/ARCA y del SCT que usa SCTv1.py.
+
+Reproduce los IDs y la estructura de los elementos de los que depende el script
+(login en dos pasos, buscador del portal, selector de contribuyente, popup de
+noticias, tabla con botón XLSX y menú de usuario), con latencia configurable e
+inyección de errores 401 y de autenticación. Sirve para medir y probar el
+rendimiento sin usar credenciales reales.
+
+Uso:
+    python mock_afip.py --puerto 8765 --latencia 0.2 --prob-401 0.1
+    python SCTv1.py --login-url http://127.0.0.1:8765/contribuyente_/login.xhtml ...
+"""
+import argparse
+import csv
+import html
+import io
+import random
+import threading
+import time
+import uuid
+import zipfile
+from datetime import date
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, quote
+from xml.sax.saxutils import escape
+
+LOGIN_PATH = "/contribuyente_/login.xhtml"
+
+SCT_COLUMNS = ["Impuesto", "Concepto / Subconcepto", "Ant. / Cuota", "Período Fiscal",
+               "Fecha de Vencimiento", "Saldo", "Int. resarcitorios", "Int. punitorios"]
+
+IMPUESTOS = [
+    "217 - SICORE-IMPTO.A LAS GANANCIAS",
+    "353 - RETENCIONES CONTRIB.SEG.SOCIAL",
+    "767 - SICORE - RETENCIONES Y PERCEPC",
+    "30 - IVA",
+    "11 - GANANCIAS PERSONAS HUMANAS",
+]
+CONCEPTOS = ["19 - Declaración Jurada", "736 - Retenciones", "51 - Intereses Resarcitorios"]
+
+PAGE = """<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{body}</body></html>"""
+
+LOGIN_STEP1 = """
+<form id="F1" method="post" action="{login_path}">
+  <label for="F1:username">CUIT/CUIL</label>
+  <input type="text" id="F1:username" name="F1:username" autocomplete="off">
+  <button type="submit" id="F1:btnSiguiente">Siguiente</button>
+</form>"""
+
+LOGIN_STEP2 = """
+<form id="F1" method="post" action="{login_path}">
+  <input type="hidden" name="F1:username" value="{cuit}">
+  <p>CUIT/CUIL: {cuit}</p>
+  <label for="F1:password">Clave</label>
+  <input type="password" id="F1:password" name="F1:password">
+  <span id="F1:msg" style="color:red">{mensaje}</span>
+  <button type="submit" id="F1:btnIngresar">Ingresar</button>
+</form>"""
+
+PORTAL = """
+<header>
+  <span id="userIconoChico" style="cursor:pointer" onclick="document.getElementById('contBtnContribuyente').style.display='block'">{cuit}</span>
+  <div id="contBtnContribuyente" style="display:none">
+    <div>Mis datos</div><div>Mis servicios</div><div>Domicilio</div><div>Relaciones</div><div>Ayuda</div>
+    <div><button type="button" onclick="location.href='/logout'"><div><div>&#x2715;</div><div>Cerrar sesión</div></div></button></div>
+  </div>
+</header>
+<input type="text" id="buscadorInput" placeholder="Buscar servicio" autocomplete="off">
+<div id="resultados"></div>
+<script>
+document.getElementById('buscadorInput').addEventListener('input', function () {{
+  var value = this.value.toLowerCase();
+  var results = document.getElementById('resultados');
+  setTimeout(function () {{
+    if (value.indexOf('cuentas trib') >= 0) {{
+      results.innerHTML = '<div id="rbt-menu-item-0"><a href="{sct_url}/sct/entrada?cuit={cuit}" target="_blank">' +
+        '<div><div><div><div><p>Sistema de Cuentas Tributarias</p></div></div></div></div></a></div>';
+    }} else {{
+      results.innerHTML = '';
+    }}
+  }}, {busqueda_ms});
+}});
+</script>"""
+
+SCT_PAGE = """
+{popup}
+<h1>Sistema de Cuentas Tributarias</h1>
+<form method="post" action="/sct/">
+  <div id="cuitForm">
+    <select name="$PropertySelection" onchange="javascript:this.form.submit();">{opciones}</select>
+  </div>
+</form>
+<form id="filtroPeriodos" method="get" action="/sct/consulta">
+  <input type="hidden" name="cuit" value="{contribuyente}">
+  <label for="periodoDesde">Período desde</label>
+  <input type="text" id="periodoDesde" name="desde" value="{desde}" autocomplete="off">
+  <label for="periodoHasta">Período hasta</label>
+  <input type="text" id="periodoHasta" name="hasta" value="{hasta}" autocomplete="off">
+  <select id="impuesto" name="impuesto"><option value="">Todos</option>{impuestos}</select>
+  <button type="submit" id="btnConsultar">Consultar</button>
+</form>
+<div id="DataTables_Table_0_wrapper">
+  <div class="dt-buttons">
+    <a href="#" class="buttons-copy">Copiar</a>
+    <a href="/sct/export.xlsx?cuit={contribuyente}" class="buttons-excel" download="Sistema de Cuentas Tributarias.xlsx">XLSX</a>
+  </div>
+  <table id="DataTables_Table_0" class="dataTable">
+    <thead><tr>{encabezados}</tr></thead>
+    <tbody>{filas}</tbody>
+  </table>
+</div>"""
+
+POPUP = """
+<div id="noticias" style="position:fixed;top:20%;left:30%;background:#fff;border:1px solid #333;padding:1em">
+  <div><a href="#" onclick="document.getElementById('noticias').style.display='none';return false;">Cerrar</a></div>
+  <p>Novedades del Sistema de Cuentas Tributarias</p>
+</div>"""
+
+ERROR_401 = """<h1>HTTP Status 401 – Unauthorized</h1>
+<p><b>Message</b> AUTHENTICATION_ALREADY_PRESENT</p>"""
+
+ERROR_AUTH = """<p>Ha ocurrido un error al autenticar, intente nuevamente.</p>"""
+
+def format_importe(value):
+    """Formatear un importe como en el SCT: 11.100.440,72"""
+    text = f"{value:,.2f}"
+    return text.replace(",", "_").replace(".", ",").replace("_", ".")
+
+def tabla_contribuyente(cuit, variacion=0.0, fecha=None):
+    """Filas sintéticas y deterministas de la pantalla inicial para un contribuyente.
+
+    Con variacion > 0, esa fracción de contribuyentes cambia sus saldos cada día,
+    para probar la detección de cambios entre corridas.
+    """
+    rng = random.Random(cuit)
+    cambia = rng.random() < variacion
+    if cambia:
+        rng = random.Random(f"{cuit}-{(fecha or date.today()).isoformat()}")
+    rows = []
+    for _ in range(rng.randint(1, 6)):
+        concepto = rng.choice(CONCEPTOS)
+        periodo = f"2025{rng.randint(1, 12):02d}"
+        rows.append([
+            rng.choice(IMPUESTOS),
+            f"{concepto}\n{concepto}",
+            "0",
+            periodo,
+            f"{rng.randint(1, 28):02d}/{periodo[4:]}/{periodo[:4]}",
+            format_importe(rng.uniform(0, 2_000_000)),
+            format_importe(rng.choice([0, 0, rng.uniform(0, 5000)])),
+            "0,00",
+        ])
+    return rows
+
+def periodos(desde, hasta):
+    """Períodos AAAAMM entre desde y hasta, inclusive"""
+    year, month = int(desde[:4]), int(desde[4:])
+    while f"{year}{month:02d}" <= hasta:
+        yield f"{year}{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def tabla_historica(cuit, desde, hasta, impuesto=None):
+    """Filas sintéticas de una consulta por períodos: cada período genera siempre las
+    mismas filas, así las consultas que se solapan devuelven filas repetidas."""
+    rows = []
+    for periodo in periodos(desde, hasta):
+        rng = random.Random(f"{cuit}-{periodo}")
+        for _ in range(rng.randint(0, 2)):
+            concepto = rng.choice(CONCEPTOS)
+            rows.append([
+                rng.choice(IMPUESTOS),
+                f"{concepto}\n{concepto}",
+                "0",
+                periodo,
+                f"{rng.randint(1, 28):02d}/{periodo[4:]}/{periodo[:4]}",
+                format_importe(rng.uniform(-500_000, 2_000_000)),
+                "0,00",
+                "0,00",
+            ])
+    if impuesto:
+        rows = [row for row in rows if row[0].split(" - ")[0] == impuesto]
+    return rows
+
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+def build_xlsx(rows, title="Sistema de Cuentas Tributarias > Contribuyente"):
+    """Armar un XLSX mínimo como el que genera el botón de DataTables (título + encabezados + filas)"""
+    sheet_rows = [[title]] + [SCT_COLUMNS] + rows
+    xml_rows = []
+    for r, row in enumerate(sheet_rows, start=1):
+        cells = "".join(
+            f'<c r="{column_letter(c)}{r}" t="inlineStr"><is><t xml:space="preserve">{escape(str(v))}</t></is></c>'
+            for c, v in enumerate(row))
+        xml_rows.append(f'<row r="{r}">{cells}</row>')
+    files = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'),
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Hoja1" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/></Relationships>'),
+        "xl/worksheets/sheet1.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData>{"".join(xml_rows)}</sheetData></worksheet>'),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, content in files.items():
+            z.writestr(name, content)
+    return buffer.getvalue()
+
+class MockAfipServer:
+    """Servidor HTTP de prueba con el estado de las sesiones y la configuración de fallas.
+
+    logins: {cuit_ingreso: {"clave": clave, "contribuyentes": [cuit, ...]}}. Un
+    CUIT de login desconocido se acepta con cualquier clave y se representa solo
+    a sí mismo.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latencia=0.0, latencia_export=0.0, prob_401=0.0,
+                 prob_error_auth=0.0, popup="siempre", variacion=0.0, logins=None):
+        self.latencia = latencia
+        self.latencia_export = latencia_export
+        self.prob_401 = prob_401
+        self.prob_error_auth = prob_error_auth
+        self.popup = popup
+        self.variacion = variacion
+        self.logins = logins or {}
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.stats = {"pedidos": 0, "errores_401": 0, "errores_auth": 0, "exportaciones": 0, "logins": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self):
+        return self.url + LOGIN_PATH
+
+    @property
+    def sct_url(self):
+        """El SCT se sirve con otro nombre de host, como en AFIP (portal y SCT separados)"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{'localhost' if host == '127.0.0.1' else host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def contribuyentes(self, cuit):
+        return self.logins.get(cuit, {}).get("contribuyentes", [cuit])
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _delay(self, extra=0.0):
+                if server.latencia or extra:
+                    time.sleep((server.latencia + extra) * random.uniform(0.5, 1.5))
+
+            def _session(self):
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                token = cookie["sesion"].value if "sesion" in cookie else None
+                return token, server.sessions.get(token)
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+                data = body.encode("utf-8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _page(self, title, body, status=200, headers=None):
+                self._send(status, PAGE.format(title=title, body=body), headers=headers)
+
+            def _redirect(self, location, headers=None):
+                headers = dict(headers or {})
+                headers["Location"] = location
+                self._send(303, "", headers=headers)
+
+            def _form(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                data = parse_qs(self.rfile.read(length).decode("utf-8"))
+                return {k: v[0] for k, v in data.items()}
+
+            def do_GET(self):
+                server.count("pedidos")
+                self._delay()
+                url = urlparse(self.path)
+                token, session = self._session()
+
+                if url.path == LOGIN_PATH:
+                    return self._page("Acceso con Clave Fiscal", LOGIN_STEP1.format(login_path=LOGIN_PATH))
+                if url.path == "/logout":
+                    server.sessions.pop(token, None)
+                    return self._redirect(LOGIN_PATH, {"Set-Cookie": "sesion=; Path=/; Max-Age=0"})
+                if url.path == "/sct/entrada" and session is None:
+                    # Traspaso de sesión del portal al host del SCT: la sesión abierta del login
+                    cuit = parse_qs(url.query).get("cuit", [""])[0]
+                    token = next((t for t, s in list(server.sessions.items()) if s["cuit"] == cuit), None)
+                    if token is None:
+                        return self._redirect(LOGIN_PATH)
+                    return self._redirect(self.path, {"Set-Cookie": f"sesion={token}; Path=/"})
+                if session is None:
+                    return self._redirect(LOGIN_PATH)
+
+                if url.path == "/portal/":
+                    return self._page("Portal ARCA", PORTAL.format(
+                        cuit=html.escape(session["cuit"]), busqueda_ms=int(server.latencia * 1000),
+                        sct_url=server.sct_url))
+                if url.path == "/sct/entrada":
+                    if random.random() < server.prob_401:
+                        server.count("errores_401")
+                        return self._page("Error 401", ERROR_401, status=401)
+                    if random.random() < server.prob_error_auth:
+                        server.count("errores_auth")
+                        return self._page("Error", ERROR_AUTH)
+                    return self._sct_page(session)
+                if url.path == "/sct/":
+                    return self._sct_page(session)
+                if url.path == "/sct/consulta":
+                    query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                    self._delay(server.latencia_export)
+                    return self._sct_page(session, query.get("cuit"), query)
+                if url.path == "/sct/export.xlsx":
+                    self._delay(server.latencia_export)
+                    server.count("exportaciones")
+                    # Como el botón de DataTables, exporta los datos de la página desde la que se pidió
+                    cuit = parse_qs(url.query).get("cuit", [session["contribuyente"]])[0]
+                    rows = tabla_contribuyente(cuit, server.variacion)
+                    return self._send(200, build_xlsx(rows),
+                                      "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                      {"Content-Disposition": "attachment; filename*=UTF-8''" +
+                                       quote("Sistema de Cuentas Tributarias.xlsx")})
+                return self._page("No encontrado", "<p>No encontrado</p>", status=404)
+
+            def do_POST(self):
+                server.count("pedidos")
+                self._delay()
+                url = urlparse(self.path)
+                form = self._form()
+                token, session = self._session()
+
+                if url.path == LOGIN_PATH:
+                    cuit = form.get("F1:username", "").strip()
+                    if "F1:password" not in form:
+                        return self._page("Acceso con Clave Fiscal", LOGIN_STEP2.format(
+                            login_path=LOGIN_PATH, cuit=html.escape(cuit), mensaje=""))
+                    expected = server.logins.get(cuit, {}).get("clave")
+                    if expected is not None and form["F1:password"] != expected:
+                        return self._page("Acceso con Clave Fiscal", LOGIN_STEP2.format(
+                            login_path=LOGIN_PATH, cuit=html.escape(cuit), mensaje="Clave o usuario incorrecto"))
+                    server.count("logins")
+                    token = uuid.uuid4().hex
+                    server.sessions[token] = {"cuit": cuit, "contribuyente": server.contribuyentes(cuit)[0],
+                                              "popup_visto": False}
+                    return self._redirect("/portal/", {"Set-Cookie": f"sesion={token}; Path=/"})
+                if session is None:
+                    return self._redirect(LOGIN_PATH)
+                if url.path == "/sct/":
+                    selected = form.get("$PropertySelection")
+                    if selected in server.contribuyentes(session["cuit"]):
+                        session["contribuyente"] = selected
+                    # La respuesta del formulario es la página del contribuyente elegido
+                    return self._sct_page(session, selected)
+                return self._page("No encontrado", "<p>No encontrado</p>", status=404)
+
+            def _sct_page(self, session, contribuyente=None, consulta=None):
+                if contribuyente not in server.contribuyentes(session["cuit"]):
+                    contribuyente = session["contribuyente"]
+                consulta = consulta or {}
+                selected = " selected='selected'"
+                options = "".join(
+                    f'<option value="{c}"{selected if c == contribuyente else ""}>'
+                    f'{c} - CONTRIBUYENTE {c}</option>'
+                    for c in server.contribuyentes(session["cuit"]))
+                show_popup = server.popup == "siempre" or (server.popup == "primera" and not session["popup_visto"])
+                session["popup_visto"] = True
+                if consulta.get("desde") and consulta.get("hasta"):
+                    rows = tabla_historica(contribuyente, consulta["desde"], consulta["hasta"], consulta.get("impuesto"))
+                else:
+                    rows = tabla_contribuyente(contribuyente, server.variacion)
+                body = SCT_PAGE.format(
+                    desde=html.escape(consulta.get("desde", "")),
+                    hasta=html.escape(consulta.get("hasta", "")),
+                    impuestos="".join(f'<option value="{i.split(" - ")[0]}">{html.escape(i)}</option>'
+                                      for i in IMPUESTOS),
+                    popup=POPUP if show_popup else "",
+                    contribuyente=contribuyente,
+                    opciones=options,
+                    encabezados="".join(f"<th>{html.escape(c)}</th>" for c in SCT_COLUMNS),
+                    filas="".join("<tr>" + "".join(
+                        f"<td>{html.escape(str(v)).replace(chr(10), '<br>')}</td>" for v in row) + "</tr>"
+                        for row in rows))
+                return self._page("Sistema de Cuentas Tributarias", body)
+
+        return Handler
+
+def load_logins(path):
+    """Leer un CSV de credenciales (mismas columnas que CREDENCIALES.xlsx) para el servidor"""
+    logins = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        reader = csv.DictReader(f, dialect=csv.Sniffer().sniff(sample, delimiters=",;\t"))
+        for row in reader:
+            entry = logins.setdefault(row["CUIT Ingreso"], {"clave": row["CLAVE Ingreso"], "contribuyentes": []})
+            entry["contribuyentes"].append(row["CUIT Contribuyente"])
+    return logins
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita AFIP/ARCA y el SCT para pruebas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0,
+                        help="Demora media en segundos de cada pedido")
+    parser.add_argument("--latencia-export", type=float, default=0.0,
+                        help="Demora adicional en segundos de la descarga XLSX")
+    parser.add_argument("--prob-401", type=float, default=0.0,
+                        help="Probabilidad de responder HTTP 401 AUTHENTICATION_ALREADY_PRESENT al entrar al SCT")
+    parser.add_argument("--prob-error-auth", type=float, default=0.0,
+                        help="Probabilidad de mostrar 'Ha ocurrido un error al autenticar' al entrar al SCT")
+    parser.add_argument("--popup", choices=["siempre", "primera", "nunca"], default="siempre",
+                        help="Cuándo mostrar el popup de noticias en el SCT")
+    parser.add_argument("--variacion", type=float, default=0.0,
+                        help="Fracción de contribuyentes cuyos saldos cambian cada día")
+    parser.add_argument("--credenciales",
+                        help="CSV con CUIT Ingreso, CLAVE Ingreso y CUIT Contribuyente a aceptar")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logins = load_logins(args.credenciales) if args.credenciales else {}
+    server = MockAfipServer(args.host, args.puerto, args.latencia, args.latencia_export, args.prob_401,
+                            args.prob_error_auth, args.popup, args.variacion, logins)
+    print(f"Servidor de prueba escuchando en {server.login_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()